@@ -1,13 +1,94 @@
+import os
 import time
-from selenium import webdriver
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.common.by import By
-import random
+import logging
 import json
+import math
 import re
-from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from urllib.parse import (
+    urlparse,
+    parse_qs,
+    parse_qsl,
+    urlencode,
+    urlunparse,
+    unquote,
+    quote,
+)
 
 SELECT_CONTRACT_BUTTON_SELECTOR = "#main > div > div > div:nth-child(3) > form > div > ul > li:nth-child(1) > div > div.contract-list__item-buttons > button"
+PARSE_POOLS = ["thread", "process"]
+LK_BASE_URL = "https://www.linkedin.com"
+LK_LOGIN_URL = "https://www.linkedin.com/login/"
+LK_FEED_URL = "https://www.linkedin.com/feed/"
+LK_RECRUITER_HOME_URL = "https://www.linkedin.com/talent/home"
+LK_SESSION_DIR = "./lk_session/"
+# Where LinkedIn redirects when the session isn't valid anymore
+LOGGED_OUT_URL_PATTERNS = ["/login", "/authwall", "/checkpoint", "/signup", "/uas/"]
+# Resources never read by the tools, blocked in lean mode. They are blocked by url
+# (Network.setBlockedURLs), not by resource type: blocking the Image, Font and Media
+# types would take Fetch.enable, whose paused requests must each be answered from an
+# event listener, which execute_cdp_cmd can't do. The file extensions are matched with
+# and without a query string, but the fonts and videos served from urls without one of
+# these extensions are still loaded (the images are all disabled by a preference).
+LEAN_BLOCKED_FILE_EXTENSIONS = [
+    "png",
+    "jpg",
+    "jpeg",
+    "gif",
+    "webp",
+    "svg",
+    "ico",
+    "woff",
+    "woff2",
+    "ttf",
+    "otf",
+    "mp4",
+    "webm",
+    "m3u8",
+]
+LEAN_BLOCKED_URL_PATTERNS = [
+    f"*.{extension}{query}"
+    for extension in LEAN_BLOCKED_FILE_EXTENSIONS
+    for query in ("", "?*")
+] + [
+    "*media.licdn.com/dms/image/*",
+    "*dms.licdn.com/playlist/*",
+    "*px.ads.linkedin.com/*",
+    "*linkedin.com/li/track*",
+    "*snap.licdn.com/*",
+    "*doubleclick.net/*",
+    "*google-analytics.com/*",
+    "*googletagmanager.com/*",
+]
+# Twice the size of a 1920x1080 screen, like a maximized window unzoomed to 50%, so that
+# the whole results list is rendered without any manual action
+DEFAULT_HEADLESS_WINDOW_SIZE = "3840,2160"
+# Lead ids in Sales Navigator and Recruiter profile links, which are also the ids of the
+# linkedin.com/in/ urls
+SALES_LEAD_ID_PATTERN = re.compile("/lead/(.*?),", re.IGNORECASE)
+RECRUITER_PROFILE_ID_PATTERN = re.compile("/talent/profile/([^/?#,]+)", re.IGNORECASE)
+# Tenures like "2 years 3 months in role", "1 year in company" or "5 months in role"
+IN_ROLE_TENURE_PATTERN = re.compile(
+    r"(?:(\d+)\s+years?\s*)?(?:(\d+)\s+months?\s+)?in\s+role"
+)
+IN_COMPANY_TENURE_PATTERN = re.compile(
+    r"(?:(\d+)\s+years?\s*)?(?:(\d+)\s+months?\s+)?in\s+company"
+)
+# Totals like "123 results", "1,234 total candidates", "1 234 résultats", "About 1.2K
+# results" or "2K+ results". A unit is only a K or M which isn't the start of a word.
+TOTAL_RESULTS_PATTERN = re.compile(
+    r"(\d[\d,.]*)\s*(?:([KM])(?![^\W\d_]))?\s*(\+)?", re.IGNORECASE
+)
+# The spaces grouping the thousands ("1 234", with a space, a non-breaking space, a narrow
+# or a thin one), removed before the total is parsed
+THOUSANDS_SPACE_PATTERN = re.compile(r"(?<=\d)[ \u00a0\u202f\u2009](?=\d{3}(?!\d))")
+# A number with its thousands grouped by commas or periods ("1,234,567" or "1.234")
+GROUPED_NUMBER_PATTERN = re.compile(r"\d{1,3}(?:([,.])\d{3})(?:\1\d{3})*")
+GET_PAGE_LOAD_TIME_SCRIPT = """
+const navigation = performance.getEntriesByType("navigation")[0];
+if (!navigation) return null;
+return ((navigation.loadEventEnd || performance.now()) - navigation.startTime) / 1000;
+"""
 
 
 def get_lk_credentials(path="./lk_credentials.json"):
@@ -18,6 +99,8 @@ def get_lk_credentials(path="./lk_credentials.json"):
 
 
 def enter_ids_on_lk_signin(driver, email, password):
+    from selenium.webdriver.common.by import By
+
     time.sleep(2)
     usernameInputElement = driver.find_element(By.ID, "username")
     usernameInputElement.send_keys(email)
@@ -32,14 +115,313 @@ def enter_ids_on_lk_signin(driver, email, password):
     time.sleep(5)
 
 
+def create_lk_driver(
+    session_dir=None,
+    lean=False,
+    headless=False,
+    window_size=DEFAULT_HEADLESS_WINDOW_SIZE,
+    network_stats=False,
+):
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+
+    logging.getLogger("selenium").setLevel(logging.CRITICAL)
+    options = Options()
+    if session_dir:
+        # The browser profile (cookies, local storage, cache) is kept between runs
+        profile_dir = os.path.abspath(os.path.join(session_dir, "chrome_profile"))
+        options.add_argument(f"--user-data-dir={profile_dir}")
+    if lean:
+        options.add_experimental_option(
+            "prefs", {"profile.managed_default_content_settings.images": 2}
+        )
+    if headless:
+        options.add_argument("--headless=new")
+        options.add_argument(f"--window-size={window_size}")
+    if network_stats:
+        # The network events are read back from the log by get_page_network_stats
+        options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    driver = webdriver.Chrome(options=options)
+    if lean:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd(
+            "Network.setBlockedURLs", {"urls": LEAN_BLOCKED_URL_PATTERNS}
+        )
+    if not headless:
+        driver.maximize_window()
+    return driver
+
+
+def get_page_network_stats(driver):
+    # Reading the performance log empties it, so only the requests made since the
+    # previous call are counted
+    stats = {"bytes_transferred": 0, "requests": 0, "blocked_requests": 0}
+    for entry in driver.get_log("performance"):
+        message = json.loads(entry["message"])["message"]
+        if message["method"] == "Network.loadingFinished":
+            stats["bytes_transferred"] += message["params"]["encodedDataLength"]
+            stats["requests"] += 1
+        elif message["method"] == "Network.loadingFailed":
+            if message["params"].get("blockedReason"):
+                stats["blocked_requests"] += 1
+    stats["load_time"] = driver.execute_script(GET_PAGE_LOAD_TIME_SCRIPT)
+    return stats
+
+
+def print_page_network_stats(driver):
+    stats = get_page_network_stats(driver)
+    load_time = (
+        f", page loaded in {stats['load_time']:.1f}s"
+        if stats["load_time"] is not None
+        else ""
+    )
+    print(
+        f"{stats['bytes_transferred'] / 1024:.0f}KB transferred in {stats['requests']} requests ({stats['blocked_requests']} blocked){load_time}."
+    )
+    return stats
+
+
+def save_lk_cookies(driver, session_dir):
+    os.makedirs(session_dir, exist_ok=True)
+    path = os.path.join(session_dir, "cookies.json")
+    # The cookies give access to the account, so only the user can read them
+    fd = os.open(f"{path}.tmp", os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as f:
+        json.dump(driver.get_cookies(), f)
+    os.replace(f"{path}.tmp", path)
+
+
+def load_lk_cookies(driver, session_dir, base_url=None):
+    path = os.path.join(session_dir, "cookies.json")
+    if not os.path.exists(path):
+        return 0
+    with open(path) as f:
+        cookies = json.load(f)
+    # Cookies can only be added to the domain of the current page
+    driver.get(rebase_lk_url(f"{LK_BASE_URL}/robots.txt", base_url))
+    n_loaded = 0
+    for cookie in cookies:
+        if cookie.get("expiry") and cookie["expiry"] < time.time():
+            continue
+        try:
+            driver.add_cookie(cookie)
+            n_loaded += 1
+        except Exception:
+            # Cookie of another domain, or rejected by the browser
+            pass
+    return n_loaded
+
+
+def is_lk_logged_out(driver):
+    return any(pattern in driver.current_url for pattern in LOGGED_OUT_URL_PATTERNS)
+
+
+def get_lk_session_state(driver, check_url=LK_FEED_URL):
+    # "logged_out" when LinkedIn redirects to its login pages, "contract_needed" when
+    # the session is valid but the Recruiter contract has to be selected again (on the
+    # Recruiter home page), "valid" otherwise
+    from selenium.webdriver.common.by import By
+
+    driver.get(check_url)
+    if is_lk_logged_out(driver):
+        return "logged_out"
+    if driver.find_elements(By.CSS_SELECTOR, SELECT_CONTRACT_BUTTON_SELECTOR):
+        return "contract_needed"
+    return "valid"
+
+
+def start_lk_session(
+    credentials_path,
+    session_dir=LK_SESSION_DIR,
+    fresh_session=False,
+    select_contract=False,
+    base_url=None,
+    **driver_options,
+):
+    # Returns a driver logged in to LinkedIn (and to Recruiter if select_contract),
+    # reusing the session saved in session_dir when it is still valid. With base_url,
+    # the LinkedIn pages are loaded from that server instead (see rebase_lk_url).
+    # driver_options are passed to create_lk_driver.
+    start = time.time()
+    print("Starting the driver...")
+    driver = create_lk_driver(session_dir, **driver_options)
+    check_url = rebase_lk_url(
+        LK_RECRUITER_HOME_URL if select_contract else LK_FEED_URL, base_url
+    )
+
+    if session_dir and not fresh_session:
+        load_lk_cookies(driver, session_dir, base_url)
+        session_state = get_lk_session_state(driver, check_url)
+        if session_state == "valid":
+            print(f"Warm start: reused the saved session in {time.time() - start:.1f}s")
+            return driver
+        if session_state == "contract_needed":
+            # Still logged in to LinkedIn, only the contract has to be selected again
+            print("Selecting the contract...")
+            select_contract_lk(driver)
+            save_lk_cookies(driver, session_dir)
+            print(
+                f"Warm start: reused the saved session and selected the contract in {time.time() - start:.1f}s"
+            )
+            return driver
+        print("No valid saved session, logging in.")
+
+    driver.get(rebase_lk_url(LK_LOGIN_URL, base_url))
+    # LinkedIn sends the logged in visitors to the feed (the browser profile of
+    # session_dir keeps the session, even with fresh_session)
+    if not is_lk_logged_out(driver):
+        print("Already logged in.")
+    else:
+        print("Inputting the credentials...")
+        lk_credentials = get_lk_credentials(credentials_path)
+        enter_ids_on_lk_signin(
+            driver, lk_credentials["email"], lk_credentials["password"]
+        )
+
+    if "checkpoint/challenge" in driver.current_url:
+        if driver_options.get("headless"):
+            raise RuntimeError(
+                "A double factor authentification is needed, run the tool once without headless mode to complete it."
+            )
+        print(
+            "It looks like you need to complete a double factor authentification. Please do so and press enter when you are done."
+        )
+        input()
+
+    # The contract may still be selected in the browser profile
+    if select_contract and get_lk_session_state(driver, check_url) == "contract_needed":
+        print("Selecting the contract...")
+        select_contract_lk(driver)
+
+    if session_dir:
+        save_lk_cookies(driver, session_dir)
+    print(f"Cold start: logged in in {time.time() - start:.1f}s")
+    return driver
+
+
+def rebase_lk_url(url, base_url=None):
+    # The same url on the server of base_url (scheme and host, like
+    # "http://127.0.0.1:8000" for lk_fake_server.py), unchanged without base_url
+    if not base_url:
+        return url
+    parsed_url = urlparse(url)
+    parsed_base_url = urlparse(base_url)
+    return urlunparse(
+        parsed_url._replace(
+            scheme=parsed_base_url.scheme, netloc=parsed_base_url.netloc
+        )
+    )
+
+
 def get_lk_url_from_sales_lk_url(url):
-    parsed = re.search("/lead/(.*?),", url, re.IGNORECASE)
+    parsed = SALES_LEAD_ID_PATTERN.search(url)
     if parsed:
         return f"https://www.linkedin.com/in/{parsed.group(1)}"
     return None
 
 
+def get_tenure_months(tenures, tenure_pattern):
+    # Missing (NA) when the tenure isn't given, or only as "less than a year". The same
+    # tenures come back on many rows, so each distinct one is only parsed once.
+    import pandas as pd
+
+    codes, distinct_tenures = pd.factorize(tenures)
+    parts = pd.Series(distinct_tenures).str.extract(tenure_pattern).astype(float)
+    months = parts[0].fillna(0) * 12 + parts[1].fillna(0)
+    months = months.where(parts.notna().any(axis=1)).astype("Int64")
+    # The missing tenures have the code -1, which isn't in the index: they stay NA
+    return pd.Series(months.reindex(codes).array, index=tenures.index)
+
+
+def normalize_lk_profiles(df, link_column, lead_id_pattern):
+    # Derives the columns below for the whole frame at once:
+    # - lead_id: the id of the profile in the link_column links
+    # - linkedin_url: the linkedin.com/in/ url of the profile
+    # - months_in_role and months_in_company: the tenures in the time_in_company column
+    #   (Sales Navigator), in months
+    lead_ids = df[link_column].str.extract(lead_id_pattern, expand=False)
+    df["linkedin_url"] = "https://www.linkedin.com/in/" + lead_ids
+    df["lead_id"] = lead_ids
+    if "time_in_company" in df.columns:
+        df["months_in_role"] = get_tenure_months(
+            df["time_in_company"], IN_ROLE_TENURE_PATTERN
+        )
+        df["months_in_company"] = get_tenure_months(
+            df["time_in_company"], IN_COMPANY_TENURE_PATTERN
+        )
+    return df
+
+
+def get_profile_key_from_lk_url(url):
+    # The slug of linkedin.com/in/<slug> urls, which identifies a profile. It is kept
+    # as is, as the ids of the profile urls built from Sales Navigator and Recruiter urls
+    # are case sensitive.
+    if not isinstance(url, str):
+        return None
+    parsed = re.search("/in/([^/?#,]+)", url, re.IGNORECASE)
+    if parsed:
+        return unquote(parsed.group(1))
+    return None
+
+
+def normalize_lk_profile_url(url):
+    # The canonical https://www.linkedin.com/in/<slug> url of a profile url, whatever its
+    # host, parameters or trailing slash. The other urls (Sales Navigator leads,
+    # Recruiter profiles) are normalized like the search urls, and the empty cells
+    # give None.
+    if not isinstance(url, str) or not url.strip():
+        return None
+    url = url.strip()
+    profile_key = get_profile_key_from_lk_url(url)
+    if profile_key:
+        return f"{LK_BASE_URL}/in/{quote(profile_key)}"
+    return normalize_search_url(url)
+
+
+def get_total_results_from_text(text):
+    # A rounded total ("About 1.2K") gives the highest total it can be rounded from, and
+    # an open one ("2K+") gives None, like a missing total. So does a total that can't
+    # be read without guessing ("1,23", "1.234,5", several numbers), so that the run is
+    # never cut short.
+    numbers = TOTAL_RESULTS_PATTERN.findall(THOUSANDS_SPACE_PATTERN.sub("", text))
+    if len(numbers) != 1 or numbers[0][2]:
+        return None
+    number, unit = numbers[0][0].rstrip(",."), numbers[0][1]
+    if not unit:
+        if number.isdigit():
+            return int(number)
+        if GROUPED_NUMBER_PATTERN.fullmatch(number):
+            return int(re.sub(r"[,.]", "", number))
+        return None
+    # With a unit, a comma or a period is the decimal separator ("1.2K", "1,2K")
+    if not re.fullmatch(r"\d+(?:[,.]\d+)?", number):
+        return None
+    number = number.replace(",", ".")
+    decimals = len(number.split(".")[1]) if "." in number else 0
+    scale = 1000 if unit.upper() == "K" else 1000000
+    return math.ceil((float(number) + 0.5 * 10**-decimals) * scale) - 1
+
+
+def get_lk_total_results(driver, total_results_selector):
+    from selenium.webdriver.common.by import By
+
+    # The total number of results of the search displayed on the current page, or None
+    # when it isn't displayed
+    els = driver.find_elements(By.CSS_SELECTOR, total_results_selector)
+    if not els:
+        return None
+    return get_total_results_from_text(els[0].text)
+
+
+def print_lk_throughput(n_pages, duration, verb="Loaded"):
+    print(
+        f"{verb} {n_pages} pages in {duration:.1f}s ({n_pages / max(duration, 1e-9) * 60:.1f} pages/min)."
+    )
+
+
 def select_contract_lk(driver):
+    from selenium.webdriver.common.by import By
+
     contract_filter = driver.find_element(
         By.CSS_SELECTOR, SELECT_CONTRACT_BUTTON_SELECTOR
     )
@@ -48,6 +430,46 @@ def select_contract_lk(driver):
     return
 
 
+def count_results(driver, results_selector):
+    from selenium.webdriver.common.by import By
+
+    return len(driver.find_elements(By.CSS_SELECTOR, results_selector))
+
+
+def wait_for_results(
+    driver,
+    results_selector,
+    max_wait,
+    expected_count=None,
+    poll_interval=0.25,
+    stable_time=0.5,
+    initial_count=None,
+):
+    # Wait until the results are displayed and their number stopped changing for
+    # stable_time seconds (or reached expected_count), but never more than max_wait
+    # seconds. With initial_count (the number of results displayed before scrolling),
+    # the number has to grow above it first: it is already stable when the wait starts.
+    # Returns the time waited.
+    start = time.time()
+    last_count = None
+    last_change = start
+    while True:
+        now = time.time()
+        if now - start >= max_wait:
+            return now - start
+        count = count_results(driver, results_selector)
+        if count != last_count:
+            last_count = count
+            last_change = now
+        if count > 0:
+            if expected_count and count >= expected_count:
+                return now - start
+            has_grown = initial_count is None or count > initial_count
+            if has_grown and now - last_change >= stable_time:
+                return now - start
+        time.sleep(poll_interval)
+
+
 def remove_url_parameter(url, param):
     parsed_url = urlparse(url)
     query_params = parse_qs(parsed_url.query)
@@ -68,3 +490,41 @@ def remove_url_parameter(url, param):
     )
 
     return new_url
+
+
+def normalize_search_url(url):
+    # The same search always gives the same url, whatever the order of its parameters
+    parsed_url = urlparse(url)
+    query_params = sorted(parse_qsl(parsed_url.query, keep_blank_values=True))
+    return urlunparse(
+        (
+            parsed_url.scheme.lower(),
+            parsed_url.netloc.lower(),
+            parsed_url.path.rstrip("/"),
+            parsed_url.params,
+            urlencode(query_params),
+            "",
+        )
+    )
+
+
+def create_parse_executor(parse_workers=0, parse_pool="thread"):
+    if parse_workers <= 0:
+        return None
+    if parse_pool == "process":
+        return ProcessPoolExecutor(max_workers=parse_workers)
+    return ThreadPoolExecutor(max_workers=parse_workers)
+
+
+def pop_parsed_pages(pending_pages, wait=False, metrics=None):
+    # The pages are returned in the order they were submitted, whatever the order in
+    # which their parsing finished. The workers return the rows of the page with the
+    # spans they recorded (see lk_metrics.run_with_spans).
+    parsed_pages = []
+    while pending_pages and (wait or pending_pages[0][1].done()):
+        page, parsed_page = pending_pages.popleft()
+        rows, spans = parsed_page.result()
+        if metrics:
+            metrics.add_spans(spans)
+        parsed_pages.append((page, rows))
+    return parsed_pages
@@ -0,0 +1,833 @@
+"""
+This is meant to be run as a CLI script.
+It will measure the parsing throughput (cards/s) and peak memory of the search scrapers
+on synthetic search pages (see lk_fixtures.py), and compare them to a stored baseline.
+The run fails (exit code 1) if a result regressed by more than the tolerance, or if
+there is no baseline yet (--update-baseline stores one). Before measuring a scraper, it
+checks that the parser backends extract the same rows.
+
+The other modes only measure, the checks of their results are in lk_checks.py.
+
+With --records, it instead measures the memory taken by a large number of rows kept in
+memory as records (see lk_records.py) compared to dicts, and by their conversion to a
+DataFrame.
+
+With --normalize, it instead compares the time taken to derive the profile urls, lead
+ids and tenures of a large number of rows by the normalization stage
+(normalize_lk_profiles) and by a per-row apply.
+
+With --end-to-end, it instead runs whole scrapes (login included, in a headless
+Chrome) against lk_fake_server.py, and measures their throughput (pages/min) after the
+login. The results are compared to the baseline like the parsing ones.
+
+With --xlsx, it instead measures the peak memory (RSS, each export running in a process
+of its own) and the duration of an xlsx export of a large number of rows, written page
+by page by the streaming writer (see lk_writers.py) compared to the rows kept in memory
+and written at the end with DataFrame.to_excel.
+
+With --in-browser, it instead compares, on the pages of lk_fake_server.py (in a headless
+Chrome), the results extracted in the browser (see lk_browser_extraction.py) to the
+page source parsed in Python: it measures the data read from the browser (page source
+or JSON) and the time taken per page.
+
+With --startup, it instead measures the time the tools take to answer --help, through
+lk_cli.py (which only imports what a subcommand needs once its options are parsed)
+and through their scripts (which import everything first).
+
+Example usage:
+python lk_benchmark.py --cards 25 --pages 20 --backends html.parser lxml
+python lk_benchmark.py --padding-kb 2048
+python lk_benchmark.py --update-baseline
+python lk_benchmark.py --records 50000
+python lk_benchmark.py --normalize 100000
+python lk_benchmark.py --xlsx 100000
+python lk_benchmark.py --startup
+python lk_benchmark.py --end-to-end --pages 10 --latency 0.2 --render-delay 0.5
+python lk_benchmark.py --in-browser --pages 10 --padding-kb 2048
+"""
+import argparse
+import contextlib
+import gc
+import importlib
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import pandas as pd
+from general_lk_utils import (
+    normalize_lk_profiles,
+    SALES_LEAD_ID_PATTERN,
+    RECRUITER_PROFILE_ID_PATTERN,
+    IN_ROLE_TENURE_PATTERN,
+    IN_COMPANY_TENURE_PATTERN,
+)
+from lk_html_backends import PARSER_BACKENDS, DEFAULT_PARSER_BACKEND
+from lk_fixtures import make_lksn_search_page, make_lkr_search_page
+from lk_records import ResultTable
+from lk_search import save_info
+from lk_writers import create_result_writer
+
+BASELINE_PATH = "./benchmarks/baseline.json"
+# The scripts run by the startup benchmark, next to this one
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def get_lksn_parse_function():
+    from lksn_search_scraper import get_all_info_from_page_source
+
+    return get_all_info_from_page_source
+
+
+def get_lkr_parse_function():
+    from lkr_search_scraper import parse_search_page
+
+    return parse_search_page
+
+
+BENCHMARK_SUITES = {
+    "lksn": (make_lksn_search_page, get_lksn_parse_function),
+    "lkr": (make_lkr_search_page, get_lkr_parse_function),
+}
+# The subcommand of lk_cli.py of each scraper, and the search scraped end to end
+END_TO_END_SEARCHES = {
+    "lksn": (
+        "salesnav",
+        "https://www.linkedin.com/sales/search/people?query=(keywords%3Abenchmark)",
+    ),
+    "lkr": (
+        "recruiter",
+        "https://www.linkedin.com/talent/search?searchContextId=benchmark",
+    ),
+}
+# The subcommands of lk_cli.py and the scripts running them
+STARTUP_COMMANDS = {
+    "salesnav": "lksn_search_scraper.py",
+    "recruiter": "lkr_search_scraper.py",
+    "visit": "lk_visitor.py",
+}
+# The rows normalized are copies of the rows of this number of pages
+NORMALIZE_SAMPLE_PAGES = 40
+XLSX_EXPORTS = ["streaming", "to_excel"]
+# The functions of each scraper parsing the page source and extracting the same rows in
+# the browser
+IN_BROWSER_FUNCTIONS = {
+    "lksn": ("get_all_info_from_page_source", "get_all_info_from_browser"),
+    "lkr": ("parse_search_page", "parse_search_page_in_browser"),
+}
+# The column of the profile links of each scraper, and the pattern of their lead ids
+NORMALIZE_SUITES = {
+    "lksn": ("link_to_profile", SALES_LEAD_ID_PATTERN),
+    "lkr": ("recruiter_link", RECRUITER_PROFILE_ID_PATTERN),
+}
+
+
+def parse_pages(parse_function, pages, parser_backend):
+    rows = []
+    # The scrapers print their progress, which isn't part of what is measured
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(
+        io.StringIO()
+    ):
+        for page_source in pages:
+            rows += parse_function(page_source, parser_backend)
+    return rows
+
+
+def run_benchmark(suite, n_cards, n_pages, parser_backend, repeat=5, padding_kb=0):
+    make_page, get_parse_function = BENCHMARK_SUITES[suite]
+    parse_function = get_parse_function()
+    pages = [make_page(n_cards, seed=i, padding_kb=padding_kb) for i in range(n_pages)]
+
+    best_duration = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = parse_pages(parse_function, pages, parser_backend)
+        duration = time.perf_counter() - start
+        if best_duration is None or duration < best_duration:
+            best_duration = duration
+    if len(rows) != n_cards * n_pages:
+        raise AssertionError(f"Expected {n_cards * n_pages} rows, got {len(rows)}")
+
+    # Measured apart as tracemalloc slows everything down. The pages are parsed one by
+    # one after a garbage collection, so that the peak doesn't depend on when the
+    # previous trees are collected.
+    peak_memory = 0
+    tracemalloc.start()
+    for page_source in pages:
+        gc.collect()
+        tracemalloc.reset_peak()
+        parse_pages(parse_function, [page_source], parser_backend)
+        peak_memory = max(peak_memory, tracemalloc.get_traced_memory()[1])
+    tracemalloc.stop()
+
+    return {
+        "cards": n_cards,
+        "pages": n_pages,
+        "padding_kb": padding_kb,
+        "cards_per_second": len(rows) / best_duration,
+        "peak_memory_mb": peak_memory / 1024**2,
+    }
+
+
+def measure_memory(function):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = function()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, current / 1024**2, peak / 1024**2
+
+
+def run_records_benchmark(suite, n_rows, parser_backend, n_cards=25):
+    make_page, get_parse_function = BENCHMARK_SUITES[suite]
+    parse_function = get_parse_function()
+    sample_rows = parse_pages(
+        parse_function, [make_page(n_cards, seed=i) for i in range(4)], parser_backend
+    )
+    record_type = type(sample_rows[0])
+    fields = record_type.FIELDS
+    # The field values are created beforehand and shared by both formats, so that only
+    # the memory of the rows themselves is measured
+    pages_values = [
+        [
+            tuple(sample_rows[(i + j) % len(sample_rows)].values())
+            for j in range(min(n_cards, n_rows - i))
+        ]
+        for i in range(0, n_rows, n_cards)
+    ]
+
+    def keep_dicts():
+        rows = []
+        for page_values in pages_values:
+            rows += [dict(zip(fields, values)) for values in page_values]
+        return rows
+
+    def keep_records():
+        table = ResultTable(record_type)
+        for page_values in pages_values:
+            table.extend([record_type(*values) for values in page_values])
+        return table
+
+    dicts, dicts_memory, _ = measure_memory(keep_dicts)
+    table, records_memory, _ = measure_memory(keep_records)
+    _, _, dicts_frame_peak = measure_memory(lambda: pd.DataFrame(dicts))
+    _, _, records_frame_peak = measure_memory(table.to_dataframe)
+    return {
+        "rows": n_rows,
+        "dicts_memory_mb": dicts_memory,
+        "records_memory_mb": records_memory,
+        "dicts_frame_peak_mb": dicts_frame_peak,
+        "records_frame_peak_mb": records_frame_peak,
+    }
+
+
+def get_lead_id_per_row(url, lead_id_pattern):
+    parsed = lead_id_pattern.search(url)
+    return parsed.group(1) if parsed else None
+
+
+def get_tenure_months_per_row(tenure, tenure_pattern):
+    parsed = tenure_pattern.search(tenure)
+    if parsed is None or parsed.groups() == (None, None):
+        return None
+    years, months = parsed.groups()
+    return int(years or 0) * 12 + int(months or 0)
+
+
+def normalize_per_row(df, link_column, lead_id_pattern):
+    # The same columns as normalize_lk_profiles, derived row by row
+    df["linkedin_url"] = df[link_column].apply(
+        lambda url: f"https://www.linkedin.com/in/{lead_id}"
+        if (lead_id := get_lead_id_per_row(url, lead_id_pattern))
+        else None
+    )
+    df["lead_id"] = df[link_column].apply(get_lead_id_per_row, args=(lead_id_pattern,))
+    if "time_in_company" in df.columns:
+        df["months_in_role"] = df.time_in_company.apply(
+            get_tenure_months_per_row, args=(IN_ROLE_TENURE_PATTERN,)
+        ).astype("Int64")
+        df["months_in_company"] = df.time_in_company.apply(
+            get_tenure_months_per_row, args=(IN_COMPANY_TENURE_PATTERN,)
+        ).astype("Int64")
+    return df
+
+
+def get_normalize_sample_frame(suite, n_rows, parser_backend, n_cards=25):
+    # The frame of n_rows rows, copies of the rows of a few pages, before normalization
+    make_page, get_parse_function = BENCHMARK_SUITES[suite]
+    sample_rows = parse_pages(
+        get_parse_function(),
+        [make_page(n_cards, seed=i) for i in range(NORMALIZE_SAMPLE_PAGES)],
+        parser_backend,
+    )
+    table = ResultTable(type(sample_rows[0]))
+    table.extend([sample_rows[i % len(sample_rows)] for i in range(n_rows)])
+    return table.to_dataframe()
+
+
+def run_normalize_benchmark(suite, n_rows, parser_backend, n_cards=25, repeat=5):
+    link_column, lead_id_pattern = NORMALIZE_SUITES[suite]
+    df = get_normalize_sample_frame(suite, n_rows, parser_backend, n_cards)
+
+    durations = {}
+    for name, normalize in [
+        ("apply", normalize_per_row),
+        ("vectorized", normalize_lk_profiles),
+    ]:
+        for _ in range(repeat):
+            frame = df.copy()
+            start = time.perf_counter()
+            normalize(frame, link_column, lead_id_pattern)
+            duration = time.perf_counter() - start
+            durations[name] = min(durations.get(name, duration), duration)
+    return {
+        "rows": n_rows,
+        "apply_rows_per_second": n_rows / durations["apply"],
+        "vectorized_rows_per_second": n_rows / durations["vectorized"],
+    }
+
+
+def measure_peak_rss(function, interval=0.01):
+    # The highest resident memory of the process while the function runs, sampled by a
+    # thread (the memory allocated outside Python, by pandas or zlib, is included)
+    import psutil
+
+    process = psutil.Process()
+    peak_rss = process.memory_info().rss
+    done = threading.Event()
+
+    def sample():
+        nonlocal peak_rss
+        while not done.wait(interval):
+            peak_rss = max(peak_rss, process.memory_info().rss)
+
+    sampler = threading.Thread(target=sample)
+    sampler.start()
+    try:
+        result = function()
+    finally:
+        done.set()
+        sampler.join()
+    return result, max(peak_rss, process.memory_info().rss) / 1024**2
+
+
+def run_xlsx_export(suite, n_rows, parser_backend, export, n_cards=25):
+    # A whole xlsx export of n_rows rows, saved page by page like during a run
+    make_page, get_parse_function = BENCHMARK_SUITES[suite]
+    parse_function = get_parse_function()
+    scraper = importlib.import_module(parse_function.__module__)
+    sample_rows = parse_pages(
+        parse_function,
+        [make_page(n_cards, seed=i) for i in range(NORMALIZE_SAMPLE_PAGES)],
+        parser_backend,
+    )
+    pages = (
+        [sample_rows[j % len(sample_rows)] for j in range(i, min(i + n_cards, n_rows))]
+        for i in range(0, n_rows, n_cards)
+    )
+    with tempfile.TemporaryDirectory() as export_dir:
+        path = os.path.join(export_dir, "export.xlsx")
+
+        def export_streaming():
+            result_writer = create_result_writer(
+                path, "xlsx", scraper.RESULT_COLUMN_TYPES
+            )
+            for page in pages:
+                save_info(scraper.PAGE_SCRAPER, page, None, [result_writer])
+            result_writer.close()
+
+        def export_to_excel():
+            table = ResultTable(type(sample_rows[0]))
+            for page in pages:
+                save_info(scraper.PAGE_SCRAPER, page, table, [])
+            scraper.get_info_frame(table).to_excel(path, index=False)
+
+        start_rss = measure_peak_rss(lambda: None)[1]
+        start = time.perf_counter()
+        _, peak_rss = measure_peak_rss(
+            export_streaming if export == "streaming" else export_to_excel
+        )
+        duration = time.perf_counter() - start
+        file_size = os.path.getsize(path)
+    return {
+        "rows": n_rows,
+        "peak_rss_mb": peak_rss - start_rss,
+        "seconds": duration,
+        "file_size_mb": file_size / 1024**2,
+    }
+
+
+def run_xlsx_benchmark(suite, n_rows, parser_backend, n_cards=25):
+    # Each export runs in a process of its own, so that the memory freed by one doesn't
+    # hide the peak of the other
+    results = {}
+    for export in XLSX_EXPORTS:
+        output = subprocess.run(
+            [
+                sys.executable,
+                __file__,
+                "--suites",
+                suite,
+                "--xlsx",
+                str(n_rows),
+                "--xlsx-export",
+                export,
+                "--cards",
+                str(n_cards),
+                "--backends",
+                parser_backend,
+            ],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        results[export] = json.loads(output.splitlines()[-1])
+    return results
+
+
+def measure_command_time(command, repeat):
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations)
+
+
+def run_startup_benchmark(subcommand, repeat=5):
+    return {
+        "cli_seconds": measure_command_time(
+            [sys.executable, os.path.join(REPO_DIR, "lk_cli.py"), subcommand, "--help"],
+            repeat,
+        ),
+        "script_seconds": measure_command_time(
+            [
+                sys.executable,
+                os.path.join(REPO_DIR, STARTUP_COMMANDS[subcommand]),
+                "--help",
+            ],
+            repeat,
+        ),
+    }
+
+
+@contextlib.contextmanager
+def start_fake_lk_session(suite, n_pages, latency=0, render_delay=None, padding_kb=0):
+    # A headless Chrome logged in to lk_fake_server.py, whose search has n_pages pages.
+    # Yields the driver, the scraper module and the search url without its page.
+    from general_lk_utils import start_lk_session, rebase_lk_url, remove_url_parameter
+    from lk_cli import SEARCH_SCRAPERS
+    from lk_fake_server import FakeLinkedInServer, NUMBER_OF_RESULTS_PER_PAGE
+
+    command, search_url = END_TO_END_SEARCHES[suite]
+    scraper = SEARCH_SCRAPERS[command]
+    module = importlib.import_module(scraper["module"])
+    server = FakeLinkedInServer(
+        ("127.0.0.1", 0),
+        latency=latency,
+        render_delay=render_delay,
+        n_results=n_pages * NUMBER_OF_RESULTS_PER_PAGE,
+        padding_kb=padding_kb,
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    search_url_base = remove_url_parameter(
+        rebase_lk_url(search_url, server.base_url), scraper["page_parameter"]
+    )
+    # A session of its own, so that the saved LinkedIn session is never touched
+    with tempfile.TemporaryDirectory() as session_dir:
+        credentials_path = os.path.join(session_dir, "lk_credentials.json")
+        with open(credentials_path, "w") as f:
+            json.dump({"email": "benchmark@example.com", "password": "benchmark"}, f)
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(
+            io.StringIO()
+        ):
+            driver = start_lk_session(
+                credentials_path,
+                session_dir=session_dir,
+                select_contract=scraper["select_contract"],
+                headless=True,
+                base_url=server.base_url,
+            )
+        try:
+            yield driver, module, search_url_base
+        finally:
+            driver.quit()
+            server.shutdown()
+            server.server_close()
+
+
+def run_end_to_end_benchmark(
+    suite, n_pages, parser_backend, latency=0, render_delay=None, padding_kb=0
+):
+    from lk_cli import SEARCH_SCRAPERS
+    from lk_fake_server import NUMBER_OF_RESULTS_PER_PAGE
+
+    scraper = SEARCH_SCRAPERS[END_TO_END_SEARCHES[suite][0]]
+    with start_fake_lk_session(suite, n_pages, latency, render_delay, padding_kb) as (
+        driver,
+        module,
+        search_url_base,
+    ):
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(
+            io.StringIO()
+        ):
+            start = time.perf_counter()
+            rows = getattr(module, scraper["scrap_function"])(
+                driver,
+                page_list=range(1, n_pages + 1),
+                get_search_url=lambda x: module.get_search_url(search_url_base, x),
+                wait_time_between_pages=0,
+                parser_backend=parser_backend,
+            )
+            duration = time.perf_counter() - start
+    if len(rows) != n_pages * NUMBER_OF_RESULTS_PER_PAGE:
+        raise AssertionError(
+            f"Expected {n_pages * NUMBER_OF_RESULTS_PER_PAGE} rows, got {len(rows)}"
+        )
+    return {
+        "cards": NUMBER_OF_RESULTS_PER_PAGE,
+        "pages": n_pages,
+        "padding_kb": padding_kb,
+        "latency": latency,
+        "render_delay": render_delay,
+        "pages_per_minute": n_pages / duration * 60,
+    }
+
+
+def run_in_browser_benchmark(suite, n_pages, parser_backend, padding_kb=0):
+    from lk_browser_extraction import get_results_json
+
+    parse_name, extract_name = IN_BROWSER_FUNCTIONS[suite]
+    transferred = {"page_source": 0, "json": 0}
+    seconds = {"page_source": 0, "json": 0}
+    with start_fake_lk_session(suite, n_pages, padding_kb=padding_kb) as (
+        driver,
+        module,
+        search_url_base,
+    ):
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(
+            io.StringIO()
+        ):
+            for p in range(1, n_pages + 1):
+                driver.get(module.get_search_url(search_url_base, p))
+                # Both read the same loaded page: the page source parsed in Python...
+                start = time.perf_counter()
+                page_source = driver.page_source
+                getattr(module, parse_name)(page_source, parser_backend)
+                seconds["page_source"] += time.perf_counter() - start
+                # ...and the results extracted in the browser
+                start = time.perf_counter()
+                getattr(module, extract_name)(driver)
+                seconds["json"] += time.perf_counter() - start
+                transferred["page_source"] += len(page_source.encode("utf-8"))
+                transferred["json"] += len(
+                    get_results_json(
+                        driver, module.RESULT_BROWSER_EXTRACTION_SPEC
+                    ).encode("utf-8")
+                )
+    return {
+        "pages": n_pages,
+        "padding_kb": padding_kb,
+        "page_source_kb_per_page": transferred["page_source"] / n_pages / 1024,
+        "json_kb_per_page": transferred["json"] / n_pages / 1024,
+        "page_source_seconds_per_page": seconds["page_source"] / n_pages,
+        "json_seconds_per_page": seconds["json"] / n_pages,
+    }
+
+
+def get_regressions(results, baseline, tolerance):
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        expected = baseline[name]
+        if (
+            expected["cards"],
+            expected["pages"],
+            expected.get("padding_kb", 0),
+            expected.get("latency"),
+            expected.get("render_delay"),
+        ) != (
+            result["cards"],
+            result["pages"],
+            result["padding_kb"],
+            result.get("latency"),
+            result.get("render_delay"),
+        ):
+            # The peak memory depends on the number of pages, so it can't be compared
+            print(f"{name}: the baseline was measured on other pages, skipping.")
+            continue
+        if "pages_per_minute" in result:
+            if result["pages_per_minute"] < expected["pages_per_minute"] * (
+                1 - tolerance
+            ):
+                regressions.append(
+                    f"{name}: {result['pages_per_minute']:.1f} pages/min (baseline: {expected['pages_per_minute']:.1f} pages/min)"
+                )
+            continue
+        if result["cards_per_second"] < expected["cards_per_second"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: {result['cards_per_second']:.0f} cards/s (baseline: {expected['cards_per_second']:.0f} cards/s)"
+            )
+        if result["peak_memory_mb"] > expected["peak_memory_mb"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: {result['peak_memory_mb']:.1f}MB peak memory (baseline: {expected['peak_memory_mb']:.1f}MB)"
+            )
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the search page parsing")
+    parser.add_argument(
+        "--suites",
+        type=str,
+        nargs="+",
+        choices=list(BENCHMARK_SUITES.keys()),
+        help="The scrapers to benchmark",
+        required=False,
+        default=list(BENCHMARK_SUITES.keys()),
+    )
+    parser.add_argument(
+        "--cards",
+        type=int,
+        help="The number of result cards per page",
+        required=False,
+        default=25,
+    )
+    parser.add_argument(
+        "--pages",
+        type=int,
+        help="The number of pages to parse",
+        required=False,
+        default=20,
+    )
+    parser.add_argument(
+        "--padding-kb",
+        type=int,
+        help="The size of the unrelated markup around the results of each page (the real pages weigh megabytes)",
+        required=False,
+        default=0,
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        help="The number of times the pages are parsed (the best time is kept)",
+        required=False,
+        default=5,
+    )
+    parser.add_argument(
+        "--backends",
+        type=str,
+        nargs="+",
+        choices=PARSER_BACKENDS,
+        help="The HTML parser backends to benchmark",
+        required=False,
+        default=[DEFAULT_PARSER_BACKEND],
+    )
+    parser.add_argument(
+        "--baseline",
+        type=str,
+        help="Path to the baseline file",
+        required=False,
+        default=BASELINE_PATH,
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        help="Relative regression allowed before the run fails",
+        required=False,
+        default=0.2,
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="Store the results as the new baseline",
+    )
+    parser.add_argument(
+        "--records",
+        type=int,
+        help="Measure the memory of this number of rows kept as records compared to dicts, instead of the parsing",
+        required=False,
+        default=None,
+    )
+    parser.add_argument(
+        "--normalize",
+        type=int,
+        help="Compare the normalization stage to a per-row apply on this number of rows, instead of the parsing",
+        required=False,
+        default=None,
+    )
+    parser.add_argument(
+        "--xlsx",
+        type=int,
+        help="Compare the peak memory of a streaming xlsx export of this number of rows to DataFrame.to_excel, instead of the parsing",
+        required=False,
+        default=None,
+    )
+    parser.add_argument(
+        "--xlsx-export",
+        type=str,
+        choices=XLSX_EXPORTS,
+        # Runs a single export of --xlsx and prints its result (see run_xlsx_benchmark)
+        help=argparse.SUPPRESS,
+        required=False,
+        default=None,
+    )
+    parser.add_argument(
+        "--end-to-end",
+        action="store_true",
+        help="Measure the throughput (pages/min) of whole scrapes against lk_fake_server.py (needs Chrome), instead of the parsing",
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        help="With --end-to-end, the time in seconds taken by the server to answer each request",
+        required=False,
+        default=0,
+    )
+    parser.add_argument(
+        "--render-delay",
+        type=float,
+        help="With --end-to-end, render the cards lazily, this time in seconds after the page is loaded or scrolled",
+        required=False,
+        default=None,
+    )
+    parser.add_argument(
+        "--in-browser",
+        action="store_true",
+        help="Compare the results extracted in the browser to the parsed page source on pages of lk_fake_server.py (needs Chrome), instead of the parsing",
+    )
+    parser.add_argument(
+        "--startup",
+        action="store_true",
+        help="Measure the time the tools take to answer --help, instead of the parsing",
+    )
+    args = parser.parse_args()
+    from lk_checks import check_backends_equivalence
+
+    if args.startup:
+        for subcommand in STARTUP_COMMANDS:
+            result = run_startup_benchmark(subcommand, args.repeat)
+            print(
+                f"{subcommand}: --help answered in {result['cli_seconds']:.2f}s through lk_cli.py, "
+                f"{result['script_seconds']:.2f}s through {STARTUP_COMMANDS[subcommand]}"
+            )
+        sys.exit(0)
+
+    if args.in_browser:
+        for suite in args.suites:
+            result = run_in_browser_benchmark(
+                suite, args.pages, args.backends[0], args.padding_kb
+            )
+            print(
+                f"{suite}: {result['json_kb_per_page']:.1f}KB of JSON per page extracted in {result['json_seconds_per_page'] * 1000:.0f}ms, "
+                f"{result['page_source_kb_per_page']:.1f}KB of page source per page read and parsed in {result['page_source_seconds_per_page'] * 1000:.0f}ms"
+            )
+        sys.exit(0)
+
+    if args.normalize:
+        for suite in args.suites:
+            result = run_normalize_benchmark(
+                suite, args.normalize, args.backends[0], args.cards, args.repeat
+            )
+            print(
+                f"{suite}: {result['vectorized_rows_per_second']:.0f} rows/s normalized by the stage, "
+                f"{result['apply_rows_per_second']:.0f} rows/s with a per-row apply "
+                f"({result['vectorized_rows_per_second'] / result['apply_rows_per_second']:.1f}x)"
+            )
+        sys.exit(0)
+
+    if args.xlsx_export:
+        result = run_xlsx_export(
+            args.suites[0], args.xlsx, args.backends[0], args.xlsx_export, args.cards
+        )
+        print(json.dumps(result))
+        sys.exit(0)
+
+    if args.xlsx:
+        for suite in args.suites:
+            result = run_xlsx_benchmark(suite, args.xlsx, args.backends[0], args.cards)
+            for export in XLSX_EXPORTS:
+                print(
+                    f"{suite}[{export}]: {args.xlsx} rows exported in {result[export]['seconds']:.1f}s, "
+                    f"{result[export]['peak_rss_mb']:.1f}MB peak RSS, {result[export]['file_size_mb']:.1f}MB file"
+                )
+        sys.exit(0)
+
+    if args.records:
+        for suite in args.suites:
+            result = run_records_benchmark(
+                suite, args.records, args.backends[0], args.cards
+            )
+            print(
+                f"{suite}: {args.records} rows take {result['dicts_memory_mb']:.1f}MB as dicts, {result['records_memory_mb']:.1f}MB as records "
+                f"(DataFrame conversion peak: {result['dicts_frame_peak_mb']:.1f}MB from dicts, {result['records_frame_peak_mb']:.1f}MB from records)"
+            )
+        sys.exit(0)
+
+    if not args.update_baseline and not os.path.exists(args.baseline):
+        # A first run must not pass for lack of anything to compare to
+        print(
+            f"There is no baseline at {args.baseline}, run with --update-baseline to store the results as the baseline."
+        )
+        sys.exit(1)
+
+    results = {}
+    for suite in args.suites:
+        if args.end_to_end:
+            name = f"{suite}[end-to-end]"
+            print(f"Benchmarking {name}...")
+            results[name] = run_end_to_end_benchmark(
+                suite,
+                args.pages,
+                args.backends[0],
+                latency=args.latency,
+                render_delay=args.render_delay,
+                padding_kb=args.padding_kb,
+            )
+            print(f"{name}: {results[name]['pages_per_minute']:.1f} pages/min")
+            continue
+        check_backends_equivalence(suite, args.backends, args.cards)
+        for backend in args.backends:
+            name = f"{suite}[{backend}]"
+            print(f"Benchmarking {name}...")
+            results[name] = run_benchmark(
+                suite,
+                args.cards,
+                args.pages,
+                backend,
+                repeat=args.repeat,
+                padding_kb=args.padding_kb,
+            )
+            print(
+                f"{name}: {results[name]['cards_per_second']:.0f} cards/s, {results[name]['peak_memory_mb']:.1f}MB peak memory"
+            )
+
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=4)
+        print(f"Saved the baseline to {args.baseline}")
+        sys.exit(0)
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = get_regressions(results, baseline, args.tolerance)
+    if regressions:
+        print("Regressions compared to the baseline:")
+        for regression in regressions:
+            print(f"- {regression}")
+        sys.exit(1)
+    print("No regression compared to the baseline.")
@@ -0,0 +1,139 @@
+"""
+Extraction of the search results inside the browser, instead of reading the page source.
+
+EXTRACT_RESULTS_SCRIPT runs the selectors of a scraper on the live DOM of the page, in a
+single execute_script call, and returns a compact JSON array with one array of field
+values per card: only the values are sent from Chrome to Python, instead of the whole
+page (megabytes), and no DOM has to be rebuilt in Python.
+
+The script is generic, each scraper describes its fields with an extraction spec:
+- cards_selector: the selector of the result cards
+- body_selector and plan (optional): the elements under which the paths of the plan
+  are walked, see plan_to_json
+- columns: one column per field, in the order of the record fields. A column reads the
+  elements matched by a selector in the card ("select") or found by the plan for one of
+  its fields ("found"), and takes from the element at "index" its value:
+  - "text": its whole text, stripped (BeautifulSoup's .text)
+  - "first_text": its first child node if it is a text node or a comment, stripped
+    (.contents[0]), with "remove" removed from it
+  - "text_nodes": its text and comment child nodes, stripped, with their non-breaking
+    spaces replaced, joined with " | "
+  - "exists": whether there is an element
+  - "@<attribute>": the value of the attribute
+  and "default" when there is no element, like the BeautifulSoup path. A column can also
+  take "time": the time the card is read at in milliseconds, like time_scraped.
+The indexes are those of the elements read, the parse instructions using all the
+elements of a selector can't be extracted in the browser (see check_extraction_spec).
+
+Only the script run in Chrome tells whether a spec reads the same values as the parse
+functions of its scraper (the DOM of Chrome, textContent and getAttribute are not those
+of BeautifulSoup): lk_checks.py --in-browser checks it on the pages of
+lk_fake_server.py.
+"""
+import json
+
+EXTRACT_RESULTS_SCRIPT = """
+const spec = arguments[0];
+const isText = (node) => node.nodeType === Node.TEXT_NODE || node.nodeType === Node.COMMENT_NODE;
+function walk(el, plan, found) {
+    for (const child of el.children) {
+        for (const [name, classes, fields, children] of plan) {
+            if (child.localName === name && classes.every((c) => child.classList.contains(c))) {
+                for (const field of fields) {
+                    (found[field] = found[field] || []).push(child);
+                }
+                if (children.length) {
+                    walk(child, children, found);
+                }
+            }
+        }
+    }
+}
+function getValue(els, column) {
+    if (column.value === "time") {
+        return Date.now();
+    }
+    if (column.value === "exists") {
+        return els.length > column.index;
+    }
+    const el = els[column.index];
+    if (el === undefined) {
+        return column.default;
+    }
+    if (column.value === "text") {
+        return el.textContent.trim();
+    }
+    if (column.value === "first_text") {
+        const node = el.firstChild;
+        if (node === null) {
+            return column.default;
+        }
+        const text = isText(node) ? node.data.trim() : "";
+        return column.remove ? text.split(column.remove).join("") : text;
+    }
+    if (column.value === "text_nodes") {
+        if (el.firstChild === null) {
+            return column.default;
+        }
+        return Array.from(el.childNodes)
+            .filter(isText)
+            .map((node) => node.data.trim().replace(/\\u00a0/g, " "))
+            .join(" | ");
+    }
+    return el.getAttribute(column.value.slice(1));
+}
+const rows = [];
+for (const card of document.querySelectorAll(spec.cards_selector)) {
+    const found = {};
+    if (spec.body_selector) {
+        for (const body of card.querySelectorAll(spec.body_selector)) {
+            walk(body, spec.plan, found);
+        }
+    }
+    const selected = {};
+    rows.push(spec.columns.map((column) => {
+        let els;
+        if (column.select !== undefined) {
+            els = selected[column.select] = selected[column.select] || card.querySelectorAll(column.select);
+        } else {
+            els = found[column.found] || [];
+        }
+        return getValue(els, column);
+    }));
+}
+return JSON.stringify(rows);
+"""
+
+
+EXTRACTION_VALUES = ["text", "first_text", "text_nodes", "exists", "time"]
+
+
+def check_extraction_spec(spec):
+    # Raises a ValueError for the columns the script can't read, when the scrapers are
+    # imported rather than when their first page is extracted
+    for column in spec["columns"]:
+        value = column["value"]
+        if value not in EXTRACTION_VALUES and not value.startswith("@"):
+            raise ValueError(f"Unknown extraction value {value}")
+        if value != "time" and column.get("index", -1) < 0:
+            raise ValueError(
+                f"The column {column} doesn't read a single element, it can't be extracted in the browser"
+            )
+
+
+def plan_to_json(plan):
+    # An extraction plan (see lksn_search_scraper.compile_extraction_plan) as nested
+    # lists of [tag name, classes, fields, children], in the order of the plan
+    return [
+        [name, sorted(classes), node["fields"], plan_to_json(node)]
+        for (name, classes), node in plan["children"].items()
+    ]
+
+
+def get_results_json(driver, spec):
+    return driver.execute_script(EXTRACT_RESULTS_SCRIPT, spec)
+
+
+def extract_results_in_browser(driver, spec):
+    # The field values of each card of the current page, in the order of the columns
+    return json.loads(get_results_json(driver, spec))
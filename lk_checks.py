@@ -0,0 +1,165 @@
+"""
+This is meant to be run as a CLI script.
+It will check that the faster paths of the search scrapers give the same results as the
+ones they replace, and take less memory where that is their point. Each check is a
+function raising an AssertionError when it fails, which can also be run on its own:
+- check_backends_equivalence: the parser backends extract the same rows
+- check_normalize_equivalence: the normalization stage (normalize_lk_profiles) derives
+  the same values as a per-row apply
+- check_records_memory: the rows kept as records take less memory than dicts
+- check_xlsx_memory: the streaming xlsx export takes less memory than
+  DataFrame.to_excel
+- check_browser_extraction_equivalence (with --in-browser, needs Chrome): the results
+  extracted in the browser by EXTRACT_RESULTS_SCRIPT are the rows of the parsed page
+  source, on the pages of lk_fake_server.py
+
+The pages and the measures are those of lk_benchmark.py. The run fails (exit code 1) if
+a check failed.
+
+Example usage:
+python lk_checks.py
+python lk_checks.py --suites lksn --backends html.parser lxml --in-browser
+"""
+import argparse
+import contextlib
+import io
+import sys
+from general_lk_utils import normalize_lk_profiles
+from lk_benchmark import (
+    BENCHMARK_SUITES,
+    IN_BROWSER_FUNCTIONS,
+    NORMALIZE_SUITES,
+    parse_pages,
+    get_normalize_sample_frame,
+    normalize_per_row,
+    run_records_benchmark,
+    run_xlsx_benchmark,
+    start_fake_lk_session,
+)
+from lk_html_backends import (
+    PARSER_BACKENDS,
+    DEFAULT_PARSER_BACKEND,
+    remove_volatile_fields,
+)
+
+
+def check_backends_equivalence(suite, backends=PARSER_BACKENDS, n_cards=25):
+    make_page, get_parse_function = BENCHMARK_SUITES[suite]
+    parse_function = get_parse_function()
+    page_source = make_page(n_cards, seed=0)
+    reference_rows = None
+    for backend in backends:
+        rows = remove_volatile_fields(
+            parse_pages(parse_function, [page_source], backend)
+        )
+        if reference_rows is None:
+            reference_rows = rows
+        elif rows != reference_rows:
+            raise AssertionError(
+                f"{suite}: the {backend} backend doesn't extract the same rows as {backends[0]}"
+            )
+
+
+def check_normalize_equivalence(
+    suite, n_rows=10000, parser_backend=DEFAULT_PARSER_BACKEND
+):
+    link_column, lead_id_pattern = NORMALIZE_SUITES[suite]
+    df = get_normalize_sample_frame(suite, n_rows, parser_backend)
+    vectorized = normalize_lk_profiles(df.copy(), link_column, lead_id_pattern)
+    per_row = normalize_per_row(df.copy(), link_column, lead_id_pattern)
+    if not vectorized.equals(per_row):
+        raise AssertionError(
+            f"{suite}: the normalization stage doesn't derive the same values as the per-row apply"
+        )
+
+
+def check_records_memory(suite, n_rows=50000, parser_backend=DEFAULT_PARSER_BACKEND):
+    result = run_records_benchmark(suite, n_rows, parser_backend)
+    if result["records_memory_mb"] >= result["dicts_memory_mb"]:
+        raise AssertionError(
+            f"{suite}: {n_rows} rows take {result['records_memory_mb']:.1f}MB as records, not less than {result['dicts_memory_mb']:.1f}MB as dicts"
+        )
+
+
+def check_xlsx_memory(suite, n_rows=20000, parser_backend=DEFAULT_PARSER_BACKEND):
+    result = run_xlsx_benchmark(suite, n_rows, parser_backend)
+    streaming, to_excel = result["streaming"], result["to_excel"]
+    if streaming["peak_rss_mb"] >= to_excel["peak_rss_mb"]:
+        raise AssertionError(
+            f"{suite}: the streaming xlsx export of {n_rows} rows peaks at {streaming['peak_rss_mb']:.1f}MB, not less than {to_excel['peak_rss_mb']:.1f}MB with to_excel"
+        )
+
+
+def check_browser_extraction_equivalence(
+    suite, n_pages=2, parser_backend=DEFAULT_PARSER_BACKEND
+):
+    parse_name, extract_name = IN_BROWSER_FUNCTIONS[suite]
+    with start_fake_lk_session(suite, n_pages) as (driver, module, search_url_base):
+        for p in range(1, n_pages + 1):
+            driver.get(module.get_search_url(search_url_base, p))
+            with contextlib.redirect_stdout(io.StringIO()):
+                parsed_rows = remove_volatile_fields(
+                    getattr(module, parse_name)(driver.page_source, parser_backend)
+                )
+                extracted_rows = remove_volatile_fields(
+                    getattr(module, extract_name)(driver)
+                )
+            if not parsed_rows or extracted_rows != parsed_rows:
+                raise AssertionError(
+                    f"{suite}: the results extracted in the browser differ from the parsed ones on page {p}"
+                )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Check the results and the memory of the search scrapers"
+    )
+    parser.add_argument(
+        "--suites",
+        type=str,
+        nargs="+",
+        choices=list(BENCHMARK_SUITES.keys()),
+        help="The scrapers to check",
+        required=False,
+        default=list(BENCHMARK_SUITES.keys()),
+    )
+    parser.add_argument(
+        "--backends",
+        type=str,
+        nargs="+",
+        choices=PARSER_BACKENDS,
+        help="The HTML parser backends which must extract the same rows",
+        required=False,
+        default=PARSER_BACKENDS,
+    )
+    parser.add_argument(
+        "--in-browser",
+        action="store_true",
+        help="Also check the results extracted in the browser on the pages of lk_fake_server.py (needs Chrome)",
+    )
+    args = parser.parse_args()
+
+    checks = [
+        ("backends", lambda suite: check_backends_equivalence(suite, args.backends)),
+        ("normalize", check_normalize_equivalence),
+        ("records memory", check_records_memory),
+        ("xlsx memory", check_xlsx_memory),
+    ]
+    if args.in_browser:
+        checks.append(("in-browser extraction", check_browser_extraction_equivalence))
+    failures = []
+    for suite in args.suites:
+        for name, check in checks:
+            try:
+                check(suite)
+            except AssertionError as e:
+                failures.append(str(e))
+                print(f"{suite} {name}: failed")
+                continue
+            print(f"{suite} {name}: ok")
+    if failures:
+        print("Failed checks:")
+        for failure in failures:
+            print(f"- {failure}")
+        sys.exit(1)
+    print("All the checks passed.")
@@ -0,0 +1,485 @@
+"""
+This is meant to be run as a CLI script.
+It is the single entry point of the tools, with one subcommand per tool:
+- salesnav: scrap the search results of a LinkedIn Sales Navigator search
+- recruiter: scrap the search results of a LinkedIn Recruiter search
+- visit: visit the profiles of a file
+
+The options are parsed before anything heavy is imported: pandas, BeautifulSoup, tqdm
+and the scrapers are only imported by the subcommand that needs them, once its options
+are valid. --help or a wrong option answer right away. The scripts of the tools
+(lksn_search_scraper.py, lkr_search_scraper.py and lk_visitor.py) run the same
+subcommands.
+
+Example usage:
+python lk_cli.py salesnav --search-url "https://www.linkedin.com/sales/search/people?query=(spellCorrectionEnabled%3Atrue%2Ckeywords%3Ascraping)"
+python lk_cli.py recruiter --search-url "https://www.linkedin.com/talent/search?searchContextId=..." --start 1 --end 3
+python lk_cli.py visit --profile-file ./profiles.csv
+"""
+import argparse
+import importlib
+import time
+from general_lk_utils import LK_SESSION_DIR, DEFAULT_HEADLESS_WINDOW_SIZE, PARSE_POOLS
+from lk_html_backends import PARSER_BACKENDS, DEFAULT_PARSER_BACKEND
+
+LK_CREDENTIALS_PATH = "./lk_credentials.json"
+VISIT_JOURNAL_DIR = "./lk_visitor_data/journal/"
+SAVE_FORMATS = ["csv", "jsonl", "parquet", "xlsx"]
+
+# What differs between the search scrapers, the rest of their runs being the same
+SEARCH_SCRAPERS = {
+    "salesnav": {
+        "module": "lksn_search_scraper",
+        "scrap_function": "scrap_lksn_pages",
+        "tool": "lksn",
+        "data_dir": "./lksn_data/",
+        "file_suffix": "lk_salesnav_export",
+        "page_parameter": "page",
+        "select_contract": False,
+    },
+    "recruiter": {
+        "module": "lkr_search_scraper",
+        "scrap_function": "scrap_lkr_pages",
+        "tool": "lkr",
+        "data_dir": "./lkr_data/",
+        "file_suffix": "lk_r_export",
+        "page_parameter": "start",
+        "select_contract": True,
+    },
+}
+
+
+def get_option_names(name, underscore_alias=False):
+    # lk_visitor.py has always spelled its options with underscores
+    if underscore_alias and "-" in name:
+        return [f"--{name}", f"--{name.replace('-', '_')}"]
+    return [f"--{name}"]
+
+
+def add_session_arguments(parser, underscore_alias=False):
+    parser.add_argument(
+        *get_option_names("session-dir", underscore_alias),
+        type=str,
+        help="Directory where the browser profile and cookies are kept to reuse the LinkedIn session between runs",
+        required=False,
+        default=LK_SESSION_DIR,
+    )
+    parser.add_argument(
+        *get_option_names("fresh-session", underscore_alias),
+        action="store_true",
+        help="Log in again even if the saved session is still valid",
+    )
+    parser.add_argument(
+        "--lean",
+        action="store_true",
+        help="Block the images, fonts, videos and trackers, which are never read",
+    )
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="Run the browser without a window (needs a saved session if a double factor authentification is asked)",
+    )
+    parser.add_argument(
+        *get_option_names("window-size", underscore_alias),
+        type=str,
+        help="The size of the headless browser window (width,height)",
+        required=False,
+        default=DEFAULT_HEADLESS_WINDOW_SIZE,
+    )
+    parser.add_argument(
+        *get_option_names("network-stats", underscore_alias),
+        action="store_true",
+        help="Print the bytes transferred and the load time of each page",
+    )
+    parser.add_argument(
+        *get_option_names("metrics-dir", underscore_alias),
+        type=str,
+        help="Directory where the duration of each stage of the run is saved (spans.jsonl and metrics.prom)",
+        required=False,
+        default=None,
+    )
+    parser.add_argument(
+        *get_option_names("base-url", underscore_alias),
+        type=str,
+        help="Load the LinkedIn pages from this server instead, like lk_fake_server.py (e.g. http://127.0.0.1:8000)",
+        required=False,
+        default=None,
+    )
+
+
+def add_search_arguments(parser, start_option, end_option, page_help):
+    parser.add_argument(
+        "--search-url",
+        type=str,
+        help="The url of the search page to scrap",
+        required=False,
+    )
+    parser.add_argument(
+        start_option,
+        dest="start_page",
+        type=int,
+        help=f"The {page_help} to start scrapping from",
+        required=False,
+        default=1,
+    )
+    parser.add_argument(
+        end_option,
+        dest="end_page",
+        type=int,
+        help=f"The {page_help} to end scrapping at",
+        required=False,
+        default=1,
+    )
+    parser.add_argument(
+        "--wait-time-between-pages",
+        type=int,
+        help="The time in seconds to wait between pages",
+        required=False,
+        default=5,
+    )
+    parser.add_argument(
+        "--wait-after-page-loaded",
+        type=int,
+        help="The maximum time in seconds to wait for the results after the page is loaded",
+        required=False,
+        default=3,
+    )
+    parser.add_argument(
+        "--wait-after-scroll-down",
+        type=int,
+        help="The maximum time in seconds to wait for the results after scrolling down",
+        required=False,
+        default=3,
+    )
+    parser.add_argument(
+        "--results-stable-time",
+        type=float,
+        help="The time in seconds the number of results must stay the same for the wait to end before the maximum time",
+        required=False,
+        default=0.5,
+    )
+    parser.add_argument(
+        "--save-format",
+        type=str,
+        choices=SAVE_FORMATS,
+        help="The format to save the data in (csv, jsonl, parquet or xlsx)",
+        required=False,
+        default="csv",
+    )
+    parser.add_argument(
+        "--parser-backend",
+        type=str,
+        choices=PARSER_BACKENDS,
+        help="The HTML parser used to read the search pages",
+        required=False,
+        default=DEFAULT_PARSER_BACKEND,
+    )
+    parser.add_argument(
+        "--extract-in-browser",
+        action="store_true",
+        help="Extract the results inside the browser, with one script per page, instead of reading and parsing the page source",
+    )
+    parser.add_argument(
+        "--capture",
+        type=str,
+        help="Path of a snapshot archive where the loaded pages will be saved",
+        required=False,
+        default=None,
+    )
+    parser.add_argument(
+        "--replay",
+        type=str,
+        help="Path of a snapshot archive to extract the data from instead of using a browser",
+        required=False,
+        default=None,
+    )
+    parser.add_argument(
+        "--parse-workers",
+        type=int,
+        help="The number of workers parsing the pages while the next ones are loaded (0 to parse each page before loading the next one)",
+        required=False,
+        default=0,
+    )
+    parser.add_argument(
+        "--parse-pool",
+        type=str,
+        choices=PARSE_POOLS,
+        help="Whether the parse workers are threads or processes",
+        required=False,
+        default="thread",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Resume the previous run of the same search, skipping the pages it already scraped",
+    )
+    parser.add_argument(
+        "--profile-store",
+        type=str,
+        help="Path of a SQLite profile store where the scraped profiles will also be saved",
+        required=False,
+        default=None,
+    )
+    parser.add_argument(
+        "--delta-from",
+        type=str,
+        help="Path of a previous export of the same search: the profiles that are new, changed or disappeared since then are also saved to <file>_delta.jsonl",
+        required=False,
+        default=None,
+    )
+    add_session_arguments(parser)
+    parser.add_argument(
+        "--profile",
+        type=str,
+        help="Directory where the CPU and memory profiles of the parsing of each page are saved",
+        required=False,
+        default=None,
+    )
+
+
+def add_visit_arguments(parser):
+    parser.add_argument(
+        *get_option_names("profile-file", True),
+        type=str,
+        help="Path to the file containing the profiles to visit (accepts .csv and .xlsx as long as it has a column named 'linkedin_url')",
+        required=True,
+    )
+    parser.add_argument(
+        *get_option_names("shortest-wait-time", True),
+        type=int,
+        help="Shortest wait time in seconds between actions",
+        required=False,
+        default=4,
+    )
+    parser.add_argument(
+        *get_option_names("longest-wait-time", True),
+        type=int,
+        help="Longest wait time in seconds between actions",
+        required=False,
+        default=7,
+    )
+    parser.add_argument(
+        *get_option_names("page-load-time", True),
+        type=int,
+        help="Time to wait in seconds for page to load",
+        required=False,
+        default=3,
+    )
+    parser.add_argument(
+        *get_option_names("visit-journal-dir", True),
+        type=str,
+        help="Directory where the profiles visited from each profile file are recorded, so that running again on an interrupted file skips them",
+        required=False,
+        default=VISIT_JOURNAL_DIR,
+    )
+    add_session_arguments(parser, underscore_alias=True)
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(description="LinkedIn scraping tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    add_search_arguments(
+        subparsers.add_parser("salesnav", help="Scrap LinkedIn Sales Navigator"),
+        "--start-page",
+        "--end-page",
+        "page",
+    )
+    add_search_arguments(
+        subparsers.add_parser("recruiter", help="Scrap LinkedIn Recruiter"),
+        "--start",
+        "--end",
+        "profile number",
+    )
+    add_visit_arguments(
+        subparsers.add_parser("visit", help="Visit profiles on LinkedIn")
+    )
+    return parser
+
+
+def start_session(args, select_contract=False):
+    # The driver and login setup shared by all the subcommands
+    from general_lk_utils import start_lk_session
+
+    return start_lk_session(
+        LK_CREDENTIALS_PATH,
+        session_dir=args.session_dir,
+        fresh_session=args.fresh_session,
+        select_contract=select_contract,
+        lean=args.lean,
+        headless=args.headless,
+        window_size=args.window_size,
+        network_stats=args.network_stats,
+        base_url=args.base_url,
+    )
+
+
+def create_metrics(args, tool):
+    from lk_metrics import Metrics, NULL_METRICS
+
+    return Metrics(tool, args.metrics_dir) if args.metrics_dir else NULL_METRICS
+
+
+def run_search(args, scraper):
+    module = importlib.import_module(scraper["module"])
+    from general_lk_utils import remove_url_parameter, rebase_lk_url
+    from lk_snapshots import SnapshotArchive
+    from lk_search import replay_snapshot_archive
+    from lk_writers import create_result_writer, remove_partial_files
+    from lk_journal import RunJournal
+    from lk_profile_store import ProfileStore
+    from lk_profiling import ParseProfiler, NULL_PROFILER
+
+    parse_workers = args.parse_workers
+    if args.profile and parse_workers:
+        print("The pages are parsed one by one while profiling, without parse workers.")
+        parse_workers = 0
+    if args.extract_in_browser and parse_workers:
+        print("The results are extracted in the browser, without parse workers.")
+        parse_workers = 0
+
+    file_path = f"{scraper['data_dir']}{int(time.time() * 1000)}_{scraper['file_suffix']}.{args.save_format}"
+    # The rows are written as the pages are scraped
+    result_writers = [
+        create_result_writer(file_path, args.save_format, module.RESULT_COLUMN_TYPES)
+    ]
+    if args.profile_store:
+        result_writers.append(
+            ProfileStore(args.profile_store, scraper["tool"], "linkedin_url")
+        )
+    profiler = ParseProfiler(args.profile) if args.profile else NULL_PROFILER
+    metrics = create_metrics(args, scraper["tool"])
+
+    if args.replay:
+        print(f"Replaying the pages saved in {args.replay}...")
+        replay_snapshot_archive(
+            module.PAGE_SCRAPER,
+            SnapshotArchive(args.replay),
+            args.parser_backend,
+            result_writers=result_writers,
+            metrics=metrics,
+            profiler=profiler,
+        )
+    else:
+        search_url = rebase_lk_url(args.search_url, args.base_url)
+        search_url_base = remove_url_parameter(search_url, scraper["page_parameter"])
+        journal = RunJournal(module.JOURNAL_DIR, search_url_base, resume=args.resume)
+        if args.resume:
+            print(
+                f"Resuming the run, {len(journal.get_pages())} pages already scraped."
+            )
+            # The pages of the journal are written again to the new export
+            previous_file_path = journal.get_output_path()
+            if previous_file_path:
+                for partial_path in remove_partial_files(previous_file_path):
+                    print(f"Removed {partial_path}, left by the interrupted run.")
+        journal.record_output_path(file_path)
+
+        driver = start_session(args, select_contract=scraper["select_contract"])
+        driver.get(search_url)
+
+        # Without a window, the window size replaces the manual unzoom
+        if not args.headless:
+            print(
+                "Manual actions needed: go to the browser window and unzoom the page so that the whole page fits in the screen in 2 times. Then press enter here."
+            )
+            input()
+
+        print("Starting the scraping...")
+
+        snapshot_archive = SnapshotArchive(args.capture) if args.capture else None
+        page_list = range(args.start_page, args.end_page + 1)
+        getattr(module, scraper["scrap_function"])(
+            driver,
+            page_list=page_list,
+            get_search_url=lambda x: module.get_search_url(search_url_base, x),
+            wait_time_between_pages=args.wait_time_between_pages,
+            wait_after_page_loaded=args.wait_after_page_loaded,
+            wait_after_scroll_down=args.wait_after_scroll_down,
+            results_stable_time=args.results_stable_time,
+            parser_backend=args.parser_backend,
+            snapshot_archive=snapshot_archive,
+            parse_workers=parse_workers,
+            parse_pool=args.parse_pool,
+            result_writers=result_writers,
+            journal=journal,
+            network_stats=args.network_stats,
+            metrics=metrics,
+            profiler=profiler,
+            extract_in_browser=args.extract_in_browser,
+        )
+
+    for result_writer in result_writers:
+        result_writer.close()
+    metrics.close()
+    profiler.close()
+    print(f"Saved to {file_path}")
+    if args.delta_from:
+        from lk_delta import export_delta, get_delta_path
+
+        export_delta(args.delta_from, file_path, get_delta_path(file_path))
+
+    if not args.replay:
+        if journal.incomplete_pages:
+            print(
+                f"Some pages were not fully loaded ({', '.join(map(str, journal.incomplete_pages))}), run again with --resume to load them again."
+            )
+        else:
+            # The run is complete, there is nothing left to resume
+            journal.remove()
+        driver.close()
+
+
+def run_visit(args):
+    from general_lk_utils import print_lk_throughput
+    from lk_journal import VisitJournal
+    from lk_visitor import (
+        read_profile_urls,
+        get_urls_to_visit,
+        visit_pages,
+        action_on_page_visit,
+    )
+
+    profile_urls = get_urls_to_visit(
+        read_profile_urls(args.profile_file), args.base_url
+    )
+    print(f"Found {len(profile_urls)} profile urls.")
+    journal = VisitJournal(args.visit_journal_dir, args.profile_file)
+
+    metrics = create_metrics(args, "visitor")
+    driver = start_session(args)
+    start = time.time()
+    n_visited_urls = visit_pages(
+        driver,
+        args.page_load_time,
+        profile_urls,
+        lambda browser: action_on_page_visit(
+            browser, args.shortest_wait_time, args.longest_wait_time
+        ),
+        network_stats=args.network_stats,
+        metrics=metrics,
+        journal=journal,
+    )
+    print_lk_throughput(n_visited_urls, time.time() - start, "Visited")
+    # All the profiles of the file were visited, there is nothing left to resume
+    journal.remove()
+    metrics.close()
+    driver.close()
+
+
+def main(argv=None):
+    parser = get_parser()
+    args = parser.parse_args(argv)
+    if args.command == "visit":
+        run_visit(args)
+        return
+    if not args.search_url and not args.replay:
+        parser.error("--search-url is required unless --replay is used")
+    if args.replay and args.extract_in_browser:
+        parser.error(
+            "--extract-in-browser can't be used with --replay, which has no browser"
+        )
+    run_search(args, SEARCH_SCRAPERS[args.command])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Delta between two exports of the same search, for the searches that are scraped again
+regularly: only the profiles that are new, changed or disappeared since the previous
+export are written to the change file, so that the unchanged ones don't have to be
+ingested again.
+
+The profiles are matched on their profile key (the slug of their linkedin_url, like in
+the profile store), and compared on the hash of their content: all the columns found in
+both exports, except time_scraped, the links to the profile, which only identify it
+and carry tokens that change from a search to the next, and the tenures (time_in_company
+and the months derived from it), which grow every month: a new role or company shows in
+role_name and company_name. The values are compared as text, so that exports in
+different formats (csv, jsonl, parquet or xlsx) can be compared.
+
+The change file has one JSON line per change:
+{"change": "new", "profile_key": ..., "row": {...}}
+{"change": "changed", "profile_key": ..., "fields": ["role_name", ...], "row": {...}}
+{"change": "disappeared", "profile_key": ..., "linkedin_url": ...}
+
+It can also be run as a CLI script.
+
+Example usage:
+python lk_delta.py --previous ./lksn_data/1692694694168_lk_salesnav_export.csv --current ./lksn_data/1693299494168_lk_salesnav_export.csv
+"""
+import argparse
+import json
+import os
+import pandas as pd
+from general_lk_utils import get_profile_key_from_lk_url
+from lk_writers import get_json_records
+
+PROFILE_URL_COLUMN = "linkedin_url"
+# The columns that change from a run to the next without the profile changing
+IGNORED_COLUMNS = [
+    "time_scraped",
+    "link_to_profile",
+    "recruiter_link",
+    "linkedin_link",
+    "time_in_company",
+    "months_in_role",
+    "months_in_company",
+]
+CHANGES = ["new", "changed", "disappeared"]
+
+
+def read_export_file(path):
+    # The values that could lose their formatting (leading zeros...) are read as text
+    if path.endswith(".csv"):
+        try:
+            return pd.read_csv(path, dtype=str, keep_default_na=False)
+        except pd.errors.EmptyDataError:
+            # Written without a header by a run without results
+            return pd.DataFrame()
+    if path.endswith(".jsonl"):
+        return pd.read_json(path, lines=True, dtype=False)
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    # ends with .xlsx
+    return pd.read_excel(path, dtype=str)
+
+
+def read_export(path):
+    df = read_export_file(path)
+    # An export without results has no rows, and may have no columns
+    if PROFILE_URL_COLUMN not in df.columns and len(df) == 0:
+        df[PROFILE_URL_COLUMN] = pd.Series(dtype=object)
+    return df
+
+
+def get_delta_path(export_path):
+    return f"{os.path.splitext(export_path)[0]}_delta.jsonl"
+
+
+def get_comparable_value(value):
+    # The same text whatever the format the value was read from (12, 12.0 and "12",
+    # True and "True"), None for the missing values and empty cells
+    if pd.isna(value) or value == "":
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
+
+
+def get_comparable_frame(df, columns):
+    # get_comparable_value on all the values, by column
+    comparable = {}
+    for column in columns:
+        values = df[column]
+        if pd.api.types.is_float_dtype(values):
+            comparable[column] = values.map(get_comparable_value).astype(object)
+            continue
+        text = values.astype(str).astype(object)
+        comparable[column] = text.where(values.notna() & (text != ""), None)
+    return pd.DataFrame(comparable, columns=columns)
+
+
+def get_profile_hashes(df, comparable_df):
+    # The hash of the content of each profile and the position of its row, by profile
+    # key. A profile found twice keeps its last row.
+    profile_keys = df[PROFILE_URL_COLUMN].map(get_profile_key_from_lk_url)
+    if len(comparable_df.columns) > 0:
+        content_hashes = pd.util.hash_pandas_object(comparable_df, index=False)
+    else:
+        # No column to compare (an export without results has none), the profiles are
+        # only matched
+        content_hashes = [0] * len(df)
+    return {
+        profile_key: (content_hash, i)
+        for i, (profile_key, content_hash) in enumerate(
+            zip(profile_keys, content_hashes)
+        )
+        if profile_key is not None
+    }
+
+
+def get_delta(previous_df, current_df):
+    content_columns = [
+        column
+        for column in current_df.columns
+        if column in previous_df.columns
+        and column not in IGNORED_COLUMNS
+        and column != PROFILE_URL_COLUMN
+    ]
+    previous_comparable_df = get_comparable_frame(previous_df, content_columns)
+    current_comparable_df = get_comparable_frame(current_df, content_columns)
+    previous_profiles = get_profile_hashes(previous_df, previous_comparable_df)
+    current_profiles = get_profile_hashes(current_df, current_comparable_df)
+
+    changes = []
+    changed_rows = []
+    for profile_key, (content_hash, i) in current_profiles.items():
+        if profile_key not in previous_profiles:
+            changes.append({"change": "new", "profile_key": profile_key})
+            changed_rows.append(i)
+            continue
+        previous_hash, previous_i = previous_profiles[profile_key]
+        if content_hash == previous_hash:
+            continue
+        previous_values = previous_comparable_df.iloc[previous_i]
+        current_values = current_comparable_df.iloc[i]
+        fields = [
+            column
+            for column in content_columns
+            if previous_values[column] != current_values[column]
+        ]
+        changes.append(
+            {"change": "changed", "profile_key": profile_key, "fields": fields}
+        )
+        changed_rows.append(i)
+    # Only the rows of the new and changed profiles are converted
+    for change, row in zip(changes, get_json_records(current_df.iloc[changed_rows])):
+        change["row"] = row
+    for profile_key, (_, previous_i) in previous_profiles.items():
+        if profile_key not in current_profiles:
+            changes.append(
+                {
+                    "change": "disappeared",
+                    "profile_key": profile_key,
+                    "linkedin_url": previous_df[PROFILE_URL_COLUMN].iat[previous_i],
+                }
+            )
+    return changes, len(current_profiles)
+
+
+def write_delta(changes, path):
+    # Written to a temporary file first, then renamed atomically
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        for change in changes:
+            f.write(json.dumps(change, ensure_ascii=False) + "\n")
+    os.replace(f"{path}.tmp", path)
+
+
+def export_delta(previous_path, current_path, delta_path):
+    changes, n_profiles = get_delta(
+        read_export(previous_path), read_export(current_path)
+    )
+    write_delta(changes, delta_path)
+    counts = {change: 0 for change in CHANGES}
+    for change in changes:
+        counts[change["change"]] += 1
+    n_unchanged = n_profiles - counts["new"] - counts["changed"]
+    print(
+        f"Since {previous_path}: {counts['new']} new, {counts['changed']} changed and "
+        f"{counts['disappeared']} disappeared profiles ({n_unchanged} unchanged)."
+    )
+    print(f"Saved the changes to {delta_path}")
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Export the profiles that changed between two exports of a search"
+    )
+    parser.add_argument(
+        "--previous",
+        type=str,
+        help="Path to the previous export (csv, jsonl, parquet or xlsx)",
+        required=True,
+    )
+    parser.add_argument(
+        "--current",
+        type=str,
+        help="Path to the current export (csv, jsonl, parquet or xlsx)",
+        required=True,
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        help="Path of the change file (default: the current export path, ending with _delta.jsonl)",
+        required=False,
+        default=None,
+    )
+    args = parser.parse_args()
+
+    export_delta(
+        args.previous, args.current, args.output or get_delta_path(args.current)
+    )
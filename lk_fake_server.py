@@ -0,0 +1,266 @@
+"""
+Local stand-in for the LinkedIn pages used by the tools, to run them end to end without
+touching the real site (load tests, throughput regressions).
+
+It serves:
+- the login form filled by enter_ids_on_lk_signin (any email and password are accepted),
+  the logged in visitors being sent to the feed
+- the feed, and the Recruiter home page with the contract to select
+- the Sales Navigator (/sales/search/people, page=) and Recruiter (/talent/search,
+  start=) search pages, generated by lk_fixtures.py with the DOM of the real pages
+- the profile pages visited by lk_visitor.py
+
+Every page is answered after --latency seconds, and with --render-delay the cards of the
+search pages are rendered lazily by the browser (see lk_fixtures.py). The searches have
+--results results, displayed above the results like on the real pages.
+
+The tools use it with --base-url (and a session directory of their own, as the saved
+cookies are those of the fake server).
+
+Example usage:
+python lk_fake_server.py --port 8000 --latency 0.2 --render-delay 0.5
+python lk_cli.py salesnav --base-url http://127.0.0.1:8000 --session-dir ./lk_fake_session/ --search-url "https://www.linkedin.com/sales/search/people?query=(keywords%3Ascraping)" --end-page 10 --headless
+"""
+import argparse
+import time
+from html import escape
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from lk_fixtures import make_lksn_search_page, make_lkr_search_page
+
+SESSION_COOKIE = "li_at"
+CONTRACT_COOKIE = "li_contract"
+NUMBER_OF_RESULTS_PER_PAGE = 25
+
+PAGE_TEMPLATE = (
+    "<!DOCTYPE html><html><head><title>{title}</title></head><body>{body}</body></html>"
+)
+# The same structure as the real login page, see enter_ids_on_lk_signin
+LOGIN_FORM = (
+    '<div id="organic-div"><form method="post" action="/checkpoint/lg/login-submit">'
+    '<input id="username" name="session_key" type="text">'
+    '<input id="password" name="session_password" type="password">'
+    '<div class="login__form_action_container"><button type="submit">Sign in</button></div>'
+    "</form></div>"
+)
+# The same structure as the real contract list, see SELECT_CONTRACT_BUTTON_SELECTOR
+CONTRACT_CHOOSER = (
+    '<main id="main"><div><div><div><h1>Choose a contract</h1></div><div></div>'
+    '<div><form method="post" action="/talent/contract"><div><ul><li><div>'
+    "<div>Recruiter</div>"
+    '<div class="contract-list__item-buttons"><button type="submit">Continue</button></div>'
+    "</div></li></ul></div></form></div></div></div></main>"
+)
+
+
+class FakeLinkedInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        server_address,
+        latency=0,
+        render_delay=None,
+        eager_cards=10,
+        n_results=1000,
+        padding_kb=0,
+        verbose=False,
+    ):
+        super().__init__(server_address, FakeLinkedInHandler)
+        self.latency = latency
+        self.render_delay = render_delay
+        self.eager_cards = eager_cards
+        self.n_results = n_results
+        self.padding_kb = padding_kb
+        self.verbose = verbose
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def get_page_cards(self, page):
+        # The number of cards of a search page (the last ones are partial or empty)
+        return max(
+            min(
+                NUMBER_OF_RESULTS_PER_PAGE,
+                self.n_results - (page - 1) * NUMBER_OF_RESULTS_PER_PAGE,
+            ),
+            0,
+        )
+
+
+class FakeLinkedInHandler(BaseHTTPRequestHandler):
+    def get_cookies(self):
+        cookies = SimpleCookie(self.headers.get("Cookie", ""))
+        return {name: morsel.value for name, morsel in cookies.items()}
+
+    def send_html(self, body, title="LinkedIn", status=200):
+        content = PAGE_TEMPLATE.format(title=title, body=body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def redirect(self, location, cookie=None):
+        self.send_response(303)
+        self.send_header("Location", location)
+        if cookie:
+            self.send_header("Set-Cookie", f"{cookie}; Path=/")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        cookies = self.get_cookies()
+
+        if url.path == "/robots.txt":
+            content = b"User-agent: *\nDisallow: /\n"
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain")
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+        elif url.path.rstrip("/") == "/login":
+            if SESSION_COOKIE in cookies:
+                # Like LinkedIn, the logged in visitors are sent to the feed
+                self.redirect("/feed/")
+            else:
+                self.send_html(LOGIN_FORM, title="LinkedIn Login")
+        elif SESSION_COOKIE not in cookies:
+            # Like LinkedIn, the logged out visitors are sent to the login page
+            self.redirect("/login/")
+        elif url.path.rstrip("/") == "/feed":
+            self.send_html("<main><h1>Feed</h1></main>", title="Feed")
+        elif url.path.rstrip("/") == "/talent/home":
+            if CONTRACT_COOKIE not in cookies:
+                self.send_html(CONTRACT_CHOOSER, title="Recruiter")
+            else:
+                self.send_html("<main><h1>Recruiter</h1></main>", title="Recruiter")
+        elif url.path.rstrip("/") == "/sales/search/people":
+            page = int(query.get("page", ["1"])[0])
+            self.send_search_page(make_lksn_search_page, page)
+        elif url.path.rstrip("/") == "/talent/search":
+            start = int(query.get("start", ["0"])[0])
+            self.send_search_page(
+                make_lkr_search_page, start // NUMBER_OF_RESULTS_PER_PAGE + 1
+            )
+        elif url.path.startswith(("/in/", "/sales/lead/", "/talent/profile/")):
+            self.send_html(
+                f'<main id="main"><h1>{escape(url.path.split("/")[-1])}</h1></main>',
+                title="Profile",
+            )
+        else:
+            self.send_html("<h1>Not found</h1>", title="Not found", status=404)
+
+    def send_search_page(self, make_page, page):
+        content = make_page(
+            self.server.get_page_cards(page),
+            seed=page,
+            padding_kb=self.server.padding_kb,
+            render_delay=self.server.render_delay,
+            eager_cards=self.server.eager_cards,
+            total_results=self.server.n_results,
+        ).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_POST(self):
+        time.sleep(self.server.latency)
+        # The form fields are not checked
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        url = urlparse(self.path)
+        if url.path == "/checkpoint/lg/login-submit":
+            self.redirect("/feed/", f"{SESSION_COOKIE}=fake-session")
+        elif url.path == "/talent/contract":
+            self.redirect("/talent/home", f"{CONTRACT_COOKIE}=1")
+        else:
+            self.send_html("<h1>Not found</h1>", title="Not found", status=404)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Serve local stand-ins of the LinkedIn pages used by the tools"
+    )
+    parser.add_argument(
+        "--host",
+        type=str,
+        help="The address to listen on",
+        required=False,
+        default="127.0.0.1",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        help="The port to listen on",
+        required=False,
+        default=8000,
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        help="The time in seconds taken to answer each request",
+        required=False,
+        default=0,
+    )
+    parser.add_argument(
+        "--render-delay",
+        type=float,
+        help="Render the cards of the search pages lazily, this time in seconds after the page is loaded or scrolled",
+        required=False,
+        default=None,
+    )
+    parser.add_argument(
+        "--eager-cards",
+        type=int,
+        help="With --render-delay, the number of cards rendered before the page is scrolled",
+        required=False,
+        default=10,
+    )
+    parser.add_argument(
+        "--results",
+        type=int,
+        help="The number of results of the searches",
+        required=False,
+        default=1000,
+    )
+    parser.add_argument(
+        "--padding-kb",
+        type=int,
+        help="The size of the unrelated markup around the results of each search page",
+        required=False,
+        default=0,
+    )
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="Print every request",
+    )
+    args = parser.parse_args()
+
+    server = FakeLinkedInServer(
+        (args.host, args.port),
+        latency=args.latency,
+        render_delay=args.render_delay,
+        eager_cards=args.eager_cards,
+        n_results=args.results,
+        padding_kb=args.padding_kb,
+        verbose=args.verbose,
+    )
+    print(f"Serving the LinkedIn stand-in on {server.base_url} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
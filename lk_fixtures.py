@@ -0,0 +1,250 @@
+"""
+Synthetic LinkedIn search pages, used by the benchmarks.
+
+Only the parts of the pages read by the scrapers are reproduced, with the same DOM
+shape as the real ones: RESULT_SELECTOR and the IN_RESULT_* selectors for Recruiter,
+the result list and RESULT_FIELD_PATHS for Sales Navigator. The content is random
+but deterministic for a given seed, and some cards have missing fields like on the
+real pages.
+
+The real pages also contain megabytes of navigation, side panels and scripts around the
+results, which padding_kb reproduces: that amount of unrelated markup is added before
+and after the results container.
+
+With render_delay (used by lk_fake_server.py), the cards are rendered lazily in the
+browser, like on the real pages: the list items are empty at first, the first
+eager_cards are rendered render_delay seconds after the page is loaded, and the other
+ones render_delay seconds after the page or the results list is first scrolled.
+
+With total_results, the total number of results of the search is displayed above the
+results, written like LinkedIn does ("About 1.2K results" from a thousand results).
+"""
+import random
+from html import escape
+
+FIRST_NAMES = ["Camille", "Lucas", "Emma", "Hugo", "Léa", "Jules", "Chloé", "Louis"]
+LAST_NAMES = ["Martin", "Bernard", "Dubois", "Thomas", "Robert", "Richard", "Petit"]
+ROLES = ["Data Engineer", "Software Engineer", "Head of Data", "CTO", "Product Manager"]
+COMPANIES = ["Acme", "Globex", "Initech", "Umbrella", "Hooli", "Stark Industries"]
+LOCATIONS = ["Paris, Île-de-France, France", "Lyon, France", "London, United Kingdom"]
+INDUSTRIES = ["Software Development", "IT Services and IT Consulting", "Banking"]
+SCHOOLS = ["HEC Paris", "École Polytechnique", "Université Paris-Saclay", "EPFL"]
+DEGREES = ["1st", "2nd", "3rd"]
+LAZY_RENDERING_TEMPLATE = """
+<style>#search-results-container{{height:800px;overflow-y:auto}}li[data-card]{{min-height:200px}}</style>
+{templates}
+<script>
+(function () {{
+  var placeholders = Array.from(document.querySelectorAll("li[data-card]"));
+  function render(cards) {{
+    cards.forEach(function (li) {{
+      var template = document.getElementById("card-" + li.dataset.card);
+      li.replaceWith(template.content.cloneNode(true));
+    }});
+  }}
+  setTimeout(function () {{ render(placeholders.slice(0, {eager_cards})); }}, {delay_ms});
+  var scrolled = false;
+  document.addEventListener("scroll", function () {{
+    if (scrolled) return;
+    scrolled = true;
+    setTimeout(function () {{ render(placeholders.slice({eager_cards})); }}, {delay_ms});
+  }}, true);
+}})();
+</script>
+"""
+
+
+def make_padding(rng, padding_kb):
+    # Unrelated markup (menus, side panel items, inline data scripts) of about padding_kb
+    parts = []
+    size = 0
+    i = 0
+    while size < padding_kb * 1024:
+        if i % 10 == 9:
+            part = (
+                f'<script type="application/json" id="data-{i}">'
+                + ",".join(
+                    f'{{"id":{rng.randrange(10**9)},"v":"{"x" * 20}"}}'
+                    for _ in range(20)
+                )
+                + "</script>"
+            )
+        else:
+            part = (
+                f'<div class="side-panel__item ember-view" id="ember{i}"><div class="t-14">'
+                f'<a href="/feed/update/{rng.randrange(10**12)}" class="ember-view">{escape(rng.choice(COMPANIES))}</a>'
+                f'<span class="t-black--light">{escape(rng.choice(ROLES))}</span>'
+                '<button class="artdeco-button"><li-icon type="overflow"></li-icon></button></div></div>'
+            )
+        parts.append(part)
+        size += len(part)
+        i += 1
+    return "".join(parts)
+
+
+def make_card_list(cards, render_delay=None, eager_cards=10):
+    # The list items of the cards, and the markup rendering them lazily when
+    # render_delay is given (to be added outside the results container)
+    if render_delay is None:
+        return "".join(cards), ""
+    placeholders = "".join(f'<li data-card="{i}"></li>' for i in range(len(cards)))
+    templates = "".join(
+        f'<template id="card-{i}">{card}</template>' for i, card in enumerate(cards)
+    )
+    return placeholders, LAZY_RENDERING_TEMPLATE.format(
+        templates=templates,
+        eager_cards=eager_cards,
+        delay_ms=int(render_delay * 1000),
+    )
+
+
+def format_total_results(total_results, label):
+    if total_results < 1000:
+        return f"{total_results} {label}"
+    if total_results < 10000:
+        return f"About {total_results / 1000:.1f}K {label}"
+    return f"About {total_results // 1000}K {label}"
+
+
+def make_total_results(total_results, class_name, label):
+    if total_results is None:
+        return ""
+    return f'<span class="{class_name}">{format_total_results(total_results, label)}</span>'
+
+
+def make_person(rng, i):
+    return {
+        "id": f"ACwAA{i:08d}{rng.randrange(16**6):06x}",
+        "name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+        "role": rng.choice(ROLES),
+        "company": rng.choice(COMPANIES),
+        "company_id": rng.randrange(1, 10**6),
+        "location": rng.choice(LOCATIONS),
+        "industry": rng.choice(INDUSTRIES),
+        "school": rng.choice(SCHOOLS),
+        "years_in_role": rng.randrange(0, 10),
+        "months_in_role": rng.randrange(1, 12),
+        "years_in_company": rng.randrange(1, 15),
+    }
+
+
+def make_lksn_result_card(rng, i):
+    person = make_person(rng, i)
+    lead_url = f"/sales/lead/{person['id']},NAME_SEARCH,{rng.randrange(16**4):04x}"
+    premium = (
+        '<div class="inline-flex"><div><li-icon type="linkedin-bug" size="small"></li-icon></div></div>'
+        if rng.random() < 0.3
+        else ""
+    )
+    company = (
+        f'<a href="/sales/company/{person["company_id"]}" class="ember-view">{escape(person["company"])}</a>'
+        if rng.random() < 0.9
+        else ""
+    )
+    return (
+        '<li class="artdeco-list__item pl3 pv3"><div><div class="ember-view">'
+        '<div class="flex justify-space-between full-width"><div class="flex flex-column">'
+        '<div class="mb3"><div class="artdeco-entity-lockup artdeco-entity-lockup--size-4 ember-view">'
+        '<div class="artdeco-entity-lockup__content ember-view"><!---->'
+        '<div class="flex flex-wrap align-items-center">'
+        '<div class="artdeco-entity-lockup__title ember-view">'
+        f'<a href="{escape(lead_url)}" class="ember-view">{escape(person["name"])}<!----></a></div>'
+        '<div class="artdeco-entity-lockup__badge ember-view ml1">'
+        f'<span class="artdeco-entity-lockup__degree">·&nbsp;{rng.choice(DEGREES)}</span><!----></div>'
+        "</div>"
+        f"{premium}"
+        '<div class="artdeco-entity-lockup__subtitle ember-view t-14">'
+        f'<span data-anonymize="title">{escape(person["role"])}</span>'
+        '<span class="separator--middot" aria-hidden="true"></span>'
+        f"{company}</div>"
+        '<div class="artdeco-entity-lockup__metadata ember-view">'
+        f'<span class="a11y-text">Time in role</span>{person["years_in_role"]} years {person["months_in_role"]} months in role'
+        f'<span class="separator--middot" aria-hidden="true"></span>{person["years_in_company"]}&nbsp;years in company'
+        "</div></div></div></div>"
+        '<div class="ml8 pl1"><dl><div class="flex"><dt class="t-12">About:</dt><dd class="t-12">'
+        '<div class="t-black--light"><span class="a11y-text">About</span>'
+        f"<span>Working on {escape(person['role'].lower())} at {escape(person['company'])}&nbsp;and more"
+        '<button class="button--unstyled">…see more</button></span></div></dd></div></dl></div>'
+        "</div></div></div></div></li>"
+    )
+
+
+def make_lksn_search_page(
+    n_cards=25,
+    seed=0,
+    padding_kb=0,
+    render_delay=None,
+    eager_cards=10,
+    total_results=None,
+):
+    rng = random.Random(seed)
+    cards, lazy_rendering = make_card_list(
+        [make_lksn_result_card(rng, i) for i in range(n_cards)],
+        render_delay,
+        eager_cards,
+    )
+    return (
+        "<!DOCTYPE html><html><head><title>Sales Navigator</title></head><body>"
+        f'<header class="global-nav"><nav>Home{make_padding(rng, padding_kb / 2)}</nav></header><main>'
+        f'{make_total_results(total_results, "search-results__total", "results")}'
+        '<div id="search-results-container" class="p4 _vertical-scroll-results_1igybl">'
+        f'<div><ol class="artdeco-list">{cards}</ol></div></div>'
+        f"<aside>{make_padding(rng, padding_kb / 2)}</aside></main>{lazy_rendering}</body></html>"
+    )
+
+
+def make_lkr_result_card(rng, i):
+    person = make_person(rng, i)
+    graduation_start_year = 2000 + rng.randrange(20)
+    education = (
+        '<div class="history-group"><h4>Education</h4></div>'
+        '<div class="history-group"><ol><li class="row-description-entry">'
+        f'<span class="row-description-entry__title">{escape(person["school"])}</span>'
+        f'<span class="row-description-entry__date-duration">{graduation_start_year} – {graduation_start_year + rng.randrange(2, 6)}</span>'
+        "</li></ol></div>"
+        if rng.random() < 0.8
+        else ""
+    )
+    return (
+        "<li><div><article><div><div><article><div>"
+        '<div class="row__card">'
+        '<div class="row__top-card"><section><div class="artdeco-entity-lockup ember-view">'
+        '<div class="artdeco-entity-lockup__content lockup__content ember-view">'
+        '<span class="artdeco-entity-lockup__title"><span><div class="lockup__title">'
+        f'<a href="/talent/profile/{person["id"]}?project=123" class="ember-view"> {escape(person["name"])} </a>'
+        '</div></span><span class="lockup__degree">2nd</span></span>'
+        f'<div class="artdeco-entity-lockup__subtitle ember-view"> {escape(person["role"])} at {escape(person["company"])} </div>'
+        '<div class="lockup__details"><div class="lockup__details-row">'
+        f'<div class="location"> {escape(person["location"])} </div>'
+        f'<span class="industry"> {escape(person["industry"])} </span>'
+        "</div></div></div></div></section></div>"
+        f'<div class="history">{education}</div>'
+        '<div class="row__skills"><dl><div class="skills"><dt>Skills</dt><dd><div>'
+        f'<button class="skill-match"> {rng.randrange(1, 10)} skills match </button>'
+        "</div></dd></div></dl></div>"
+        "</div></div></article></div></div></article></div></li>"
+    )
+
+
+def make_lkr_search_page(
+    n_cards=25,
+    seed=0,
+    padding_kb=0,
+    render_delay=None,
+    eager_cards=10,
+    total_results=None,
+):
+    rng = random.Random(seed)
+    cards, lazy_rendering = make_card_list(
+        [make_lkr_result_card(rng, i) for i in range(n_cards)],
+        render_delay,
+        eager_cards,
+    )
+    return (
+        "<!DOCTYPE html><html><head><title>Recruiter</title></head><body>"
+        f'<header class="global-nav"><nav>Home{make_padding(rng, padding_kb / 2)}</nav></header>'
+        f'{make_total_results(total_results, "profile-list__total", "total candidates")}'
+        '<div id="results-container"><span><div><form>'
+        f'<ol class="profile-list">{cards}</ol></form></div></span></div>'
+        f"<aside>{make_padding(rng, padding_kb / 2)}</aside>{lazy_rendering}</body></html>"
+    )
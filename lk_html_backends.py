@@ -0,0 +1,203 @@
+"""
+The HTML parsers that can be used to build the DOM of a search page.
+
+"html.parser" and "lxml" are BeautifulSoup tree builders. "lexbor" uses selectolax, its
+elements are wrapped so that they expose the part of the BeautifulSoup API used by the
+scrapers (select, select_one, contents, name, get, [] and text), text nodes being
+returned as strings just like BeautifulSoup's NavigableString.
+
+Only the results container of a search page is ever read. With container_id, the page is
+cut from the start of the container, and the BeautifulSoup backends only build the
+subtree of the container (SoupStrainer). free_html then releases the tree as soon as the
+page has been extracted.
+
+It can also be run as a CLI script to check that all the backends extract the same
+rows from a saved search page and to compare their parse time.
+
+Example usage:
+python lk_html_backends.py --page-file ./page.html --scraper lksn
+"""
+import argparse
+import time
+
+PARSER_BACKENDS = ["html.parser", "lxml", "lexbor"]
+DEFAULT_PARSER_BACKEND = "html.parser"
+
+
+class LexborElement:
+    __slots__ = ("node",)
+
+    def __init__(self, node):
+        self.node = node
+
+    @property
+    def name(self):
+        return self.node.tag
+
+    def get(self, key, default=None):
+        attributes = self.node.attributes
+        if key not in attributes:
+            return default
+        value = attributes[key] or ""
+        if key == "class":
+            # Same as BeautifulSoup, which treats class as a multi-valued attribute
+            return value.split()
+        return value
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    @property
+    def contents(self):
+        contents = []
+        for child in self.node.iter(include_text=True):
+            if child.tag == "-text":
+                contents.append(child.text(deep=False))
+            elif child.tag == "-comment":
+                # BeautifulSoup keeps comments as strings without the delimiters
+                contents.append(child.html[4:-3])
+            else:
+                contents.append(LexborElement(child))
+        return contents
+
+    @property
+    def text(self):
+        return self.node.text(deep=True)
+
+    def select(self, selector):
+        return [LexborElement(node) for node in self.node.css(selector)]
+
+    def select_one(self, selector):
+        node = self.node.css_first(selector)
+        if node is None:
+            return None
+        return LexborElement(node)
+
+
+def cut_before_container(page_source, container_id):
+    # Everything before the opening tag of the container (head, navigation) is dropped.
+    # The first match is used, so the cut can only be too early, which is harmless. The
+    # page is kept whole if the container can't be found.
+    for id_attribute in (f'id="{container_id}"', f"id='{container_id}'"):
+        position = page_source.find(id_attribute)
+        if position != -1:
+            tag_start = page_source.rfind("<", 0, position)
+            if tag_start != -1:
+                return page_source[tag_start:]
+    return page_source
+
+
+def parse_html(page_source, backend=DEFAULT_PARSER_BACKEND, container_id=None):
+    if container_id:
+        page_source = cut_before_container(page_source, container_id)
+    if backend in ("html.parser", "lxml"):
+        from bs4 import BeautifulSoup, SoupStrainer
+
+        parse_only = SoupStrainer(id=container_id) if container_id else None
+        return BeautifulSoup(page_source, backend, parse_only=parse_only)
+    if backend == "lexbor":
+        try:
+            from selectolax.lexbor import LexborHTMLParser
+        except ImportError:
+            raise ImportError(
+                "The lexbor parser backend requires selectolax (pip install selectolax)"
+            )
+        return LexborElement(LexborHTMLParser(page_source).root)
+    raise ValueError(
+        f"Unknown parser backend {backend}, available backends: {', '.join(PARSER_BACKENDS)}"
+    )
+
+
+def free_html(el):
+    # A BeautifulSoup tree is full of reference cycles, it would only be freed by the
+    # next garbage collection. The lexbor tree is freed with its last element.
+    if isinstance(el, LexborElement):
+        return
+    while el.parent is not None:
+        el = el.parent
+    el.decompose()
+
+
+def compile_selector(selector, backend=DEFAULT_PARSER_BACKEND):
+    # BeautifulSoup's select and select_one accept soupsieve's compiled selectors, which
+    # are then not parsed again on every call. selectolax caches its selectors itself.
+    if backend in ("html.parser", "lxml"):
+        import soupsieve
+
+        return soupsieve.compile(selector)
+    return selector
+
+
+def remove_volatile_fields(rows):
+    return [{k: v for k, v in row.items() if k != "time_scraped"} for row in rows]
+
+
+def compare_parser_backends(page_source, extract_rows, backends=PARSER_BACKENDS):
+    timings = {}
+    reference_backend = None
+    reference_rows = None
+    for backend in backends:
+        start = time.perf_counter()
+        rows = extract_rows(page_source, backend)
+        timings[backend] = time.perf_counter() - start
+
+        rows = remove_volatile_fields(rows)
+        if reference_rows is None:
+            reference_backend = backend
+            reference_rows = rows
+        elif rows != reference_rows:
+            raise AssertionError(
+                f"The {backend} backend doesn't extract the same rows as {reference_backend}"
+            )
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the HTML parser backends")
+    parser.add_argument(
+        "--page-file",
+        type=str,
+        help="Path to a saved search page (page source)",
+        required=True,
+    )
+    parser.add_argument(
+        "--scraper",
+        type=str,
+        help="The scraper the page comes from (lksn or lkr)",
+        required=False,
+        default="lksn",
+    )
+    parser.add_argument(
+        "--backends",
+        type=str,
+        nargs="+",
+        help="The backends to compare",
+        required=False,
+        default=PARSER_BACKENDS,
+    )
+    args = parser.parse_args()
+
+    with open(args.page_file, encoding="utf-8") as f:
+        page_source = f.read()
+
+    if args.scraper == "lksn":
+        from lksn_search_scraper import get_all_info_from_page_source
+
+        extract_rows = lambda page_source, backend: get_all_info_from_page_source(
+            page_source, parser_backend=backend
+        )
+    else:
+        # scraper=="lkr"
+        from lkr_search_scraper import parse_search_page
+
+        extract_rows = lambda page_source, backend: parse_search_page(
+            page_source, parser_backend=backend
+        )
+
+    timings = compare_parser_backends(page_source, extract_rows, args.backends)
+    print("All the backends extracted the same rows.")
+    for backend, seconds in timings.items():
+        print(f"{backend}: {seconds*1000:.1f}ms")
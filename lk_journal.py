@@ -0,0 +1,146 @@
+"""
+Journal of the pages completed during a search scrape, used to resume an interrupted run.
+
+There is one journal per search, named after the hash of its normalized url. Each
+completed page is appended to it (and fsynced) as a JSON line with the page number and
+the rows it produced. The pages which were not fully loaded are not, so that resuming the
+run loads them again. Only the offset of each page is kept in memory, the rows are read
+back from the file when the run is resumed. The path of the export of the run is kept
+next to the journal (<hash>.output), so that the resumed run, which writes a new export
+with all the pages, can remove the partial files of the crashed one.
+
+The visitor keeps a journal of the profiles it visited (VisitJournal), one per profile
+file, named after the hash of its absolute path: one url per line, appended (and
+fsynced) after each visit, so that running again on the same file after an interruption
+skips them. It is removed once all the profiles of the file are visited.
+"""
+import hashlib
+import json
+import os
+from general_lk_utils import normalize_search_url
+
+
+def get_journal_path(journal_dir, search_url_base):
+    search_key = hashlib.sha256(
+        normalize_search_url(search_url_base).encode("utf-8")
+    ).hexdigest()[:16]
+    return os.path.join(journal_dir, f"{search_key}.jsonl")
+
+
+class RunJournal:
+    def __init__(self, journal_dir, search_url_base, resume=False):
+        os.makedirs(journal_dir, exist_ok=True)
+        self.path = get_journal_path(journal_dir, search_url_base)
+        self.output_record_path = f"{os.path.splitext(self.path)[0]}.output"
+        self.page_offsets = {}
+        # The pages saved with less results than expected, which aren't journaled
+        self.incomplete_pages = []
+        if resume and os.path.exists(self.path):
+            self.load_page_offsets()
+        else:
+            # Without resume, any previous journal of the same search is discarded
+            open(self.path, "w").close()
+
+    def load_page_offsets(self):
+        offset = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Partially written page (the run crashed while writing it)
+                    break
+                self.page_offsets[json.loads(line)["page"]] = offset
+                offset += len(line)
+        with open(self.path, "r+b") as f:
+            f.truncate(offset)
+
+    def has_page(self, page):
+        return page in self.page_offsets
+
+    def get_pages(self):
+        return sorted(self.page_offsets.keys())
+
+    def get_rows(self, page):
+        with open(self.path, "rb") as f:
+            f.seek(self.page_offsets[page])
+            return json.loads(f.readline())["rows"]
+
+    def record_page(self, page, rows):
+        # The rows can be any mapping (see lk_records.Record)
+        line = (
+            json.dumps({"page": page, "rows": rows}, ensure_ascii=False, default=dict)
+            + "\n"
+        )
+        with open(self.path, "ab") as f:
+            offset = f.tell()
+            f.write(line.encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+        self.page_offsets[page] = offset
+
+    def record_incomplete_page(self, page):
+        self.incomplete_pages.append(page)
+
+    def get_output_path(self):
+        # The export of the previous run of the journal, None if it wasn't recorded
+        if not os.path.exists(self.output_record_path):
+            return None
+        with open(self.output_record_path, encoding="utf-8") as f:
+            return f.read() or None
+
+    def record_output_path(self, path):
+        with open(f"{self.output_record_path}.tmp", "w", encoding="utf-8") as f:
+            f.write(path)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(f"{self.output_record_path}.tmp", self.output_record_path)
+
+    def remove(self):
+        os.remove(self.path)
+        if os.path.exists(self.output_record_path):
+            os.remove(self.output_record_path)
+
+
+def get_visit_journal_path(journal_dir, profile_file):
+    file_key = hashlib.sha256(
+        os.path.abspath(profile_file).encode("utf-8")
+    ).hexdigest()[:16]
+    return os.path.join(journal_dir, f"{file_key}.txt")
+
+
+class VisitJournal:
+    def __init__(self, journal_dir, profile_file):
+        os.makedirs(journal_dir, exist_ok=True)
+        self.path = get_visit_journal_path(journal_dir, profile_file)
+        self.visited_urls = set()
+        if os.path.exists(self.path):
+            self.load_visited_urls()
+
+    def load_visited_urls(self):
+        offset = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Partially written url (the run crashed while writing it)
+                    break
+                self.visited_urls.add(line.decode("utf-8").rstrip("\n"))
+                offset += len(line)
+        with open(self.path, "r+b") as f:
+            f.truncate(offset)
+
+    def has_url(self, url):
+        return url in self.visited_urls
+
+    def __len__(self):
+        return len(self.visited_urls)
+
+    def record_url(self, url):
+        with open(self.path, "ab") as f:
+            f.write(f"{url}\n".encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+        self.visited_urls.add(url)
+
+    def remove(self):
+        # Nothing is written before the first visit
+        if os.path.exists(self.path):
+            os.remove(self.path)
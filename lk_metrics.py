@@ -0,0 +1,186 @@
+"""
+Timing of the stages of a run (navigate, wait, scroll, page_source, parse, extract,
+write for the search scrapers), exported in machine-readable formats.
+
+Each stage is measured by a span, which carries the page it belongs to and the number
+of results of that page. When the run is over, the spans are in <metrics_dir>/spans.jsonl
+(one JSON object per span) and a summary with the p50/p95 duration of each stage is in
+<metrics_dir>/metrics.prom, in the Prometheus textfile format.
+
+When the metrics are disabled, NULL_METRICS is used: its spans don't measure nor store
+anything.
+"""
+import json
+import math
+import os
+import time
+
+PROMETHEUS_QUANTILES = [0.5, 0.95]
+
+
+class Span:
+    __slots__ = ("metrics", "record", "start")
+
+    def __init__(self, metrics, record):
+        self.metrics = metrics
+        self.record = record
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self.record
+
+    def __exit__(self, *exc_info):
+        self.record["duration"] = time.perf_counter() - self.start
+        self.metrics.add_spans([self.record])
+
+
+class NullSpan:
+    def __init__(self):
+        self.record = {}
+
+    def __enter__(self):
+        return self.record
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+class Metrics:
+    enabled = True
+
+    def __init__(self, tool, metrics_dir=None):
+        self.tool = tool
+        self.metrics_dir = metrics_dir
+        self.page = None
+        self.pending_spans = []
+        self.durations = {}
+        self.spans_file = None
+        if metrics_dir:
+            os.makedirs(metrics_dir, exist_ok=True)
+            self.spans_file = open(os.path.join(metrics_dir, "spans.jsonl"), "w")
+
+    def span(self, stage, page=None, results=None):
+        # The page defaults to the one being scraped (see self.page)
+        return Span(
+            self,
+            {
+                "tool": self.tool,
+                "stage": stage,
+                "page": self.page if page is None else page,
+                "results": results,
+                "time": time.time(),
+            },
+        )
+
+    def add_spans(self, spans):
+        # Also used to add the spans recorded by the parse workers
+        for span in spans:
+            span["tool"] = self.tool
+        self.pending_spans += spans
+
+    def end_page(self, page, results):
+        # The number of results is only known once the page is parsed, it is given to
+        # all the spans of the page before they are saved
+        spans = [span for span in self.pending_spans if span["page"] == page]
+        self.pending_spans = [
+            span for span in self.pending_spans if span["page"] != page
+        ]
+        for span in spans:
+            if span["results"] is None:
+                span["results"] = results
+        self.save_spans(spans)
+
+    def save_spans(self, spans):
+        for span in spans:
+            self.durations.setdefault(span["stage"], []).append(span["duration"])
+            if self.spans_file:
+                self.spans_file.write(json.dumps(span) + "\n")
+
+    def get_summary(self):
+        summary = {}
+        for stage, durations in self.durations.items():
+            durations = sorted(durations)
+            summary[stage] = {
+                "count": len(durations),
+                "sum": sum(durations),
+                **{
+                    quantile: durations[
+                        max(math.ceil(quantile * len(durations)) - 1, 0)
+                    ]
+                    for quantile in PROMETHEUS_QUANTILES
+                },
+            }
+        return summary
+
+    def write_prometheus_summary(self, path):
+        lines = [
+            "# HELP lk_stage_duration_seconds Duration of the stages of the scraping runs.",
+            "# TYPE lk_stage_duration_seconds summary",
+        ]
+        for stage, stage_summary in self.get_summary().items():
+            labels = f'tool="{self.tool}",stage="{stage}"'
+            for quantile in PROMETHEUS_QUANTILES:
+                lines.append(
+                    f'lk_stage_duration_seconds{{{labels},quantile="{quantile}"}} {stage_summary[quantile]:.6f}'
+                )
+            lines.append(
+                f"lk_stage_duration_seconds_sum{{{labels}}} {stage_summary['sum']:.6f}"
+            )
+            lines.append(
+                f"lk_stage_duration_seconds_count{{{labels}}} {stage_summary['count']}"
+            )
+        # The textfile collector may read the file at any time, so it is replaced atomically
+        with open(f"{path}.tmp", "w") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(f"{path}.tmp", path)
+
+    def print_summary(self):
+        for stage, stage_summary in self.get_summary().items():
+            print(
+                f"{stage}: {stage_summary['count']} spans, p50 {stage_summary[0.5]:.3f}s, p95 {stage_summary[0.95]:.3f}s, total {stage_summary['sum']:.1f}s"
+            )
+
+    def close(self):
+        self.save_spans(self.pending_spans)
+        self.pending_spans = []
+        if self.metrics_dir:
+            self.spans_file.close()
+            self.write_prometheus_summary(
+                os.path.join(self.metrics_dir, "metrics.prom")
+            )
+            print(f"Saved the metrics to {self.metrics_dir}")
+        self.print_summary()
+
+
+class NullMetrics:
+    enabled = False
+    page = None
+
+    def __init__(self):
+        self.null_span = NullSpan()
+
+    def span(self, stage, page=None, results=None):
+        return self.null_span
+
+    def add_spans(self, spans):
+        pass
+
+    def end_page(self, page, results):
+        pass
+
+    def close(self):
+        pass
+
+
+NULL_METRICS = NullMetrics()
+
+
+def run_with_spans(function, page, metrics_enabled, *args):
+    # Runs function(*args, metrics=...) in a parse worker, where the metrics of the run
+    # aren't available: the spans are recorded apart and returned with the result
+    if not metrics_enabled:
+        return function(*args, metrics=NULL_METRICS), []
+    metrics = Metrics(None)
+    metrics.page = page
+    result = function(*args, metrics=metrics)
+    return result, metrics.pending_spans
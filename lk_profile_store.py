@@ -0,0 +1,150 @@
+"""
+Local SQLite store of the profiles found by the search scrapers.
+
+Each profile is stored once, keyed by its profile key (the slug of its linkedin.com/in/
+url), along with the scraper it comes from, its latest row, and the time (ms) it was
+first and last seen. The scrapers write to it page by page, like to the other result
+writers, with one batched upsert per page.
+
+It can also be run as a CLI script to export the stored profiles.
+
+Example usage:
+python lk_profile_store.py --store ./lk_profiles.db --export ./profiles.csv --source lksn
+"""
+import argparse
+import json
+import sqlite3
+import time
+import pandas as pd
+from general_lk_utils import get_profile_key_from_lk_url
+from lk_writers import get_json_records
+
+CREATE_PROFILES_TABLE_QUERY = """
+CREATE TABLE IF NOT EXISTS profiles (
+    profile_key TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    linkedin_url TEXT,
+    data TEXT NOT NULL,
+    first_seen INTEGER NOT NULL,
+    last_seen INTEGER NOT NULL
+)
+"""
+CREATE_LAST_SEEN_INDEX_QUERY = """
+CREATE INDEX IF NOT EXISTS profiles_source_last_seen ON profiles (source, last_seen)
+"""
+UPSERT_PROFILE_QUERY = """
+INSERT INTO profiles (profile_key, source, linkedin_url, data, first_seen, last_seen)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (profile_key) DO UPDATE SET
+    source = excluded.source,
+    linkedin_url = excluded.linkedin_url,
+    data = excluded.data,
+    last_seen = excluded.last_seen
+"""
+
+
+class ProfileStore:
+    def __init__(self, path, source=None, profile_url_column="linkedin_url"):
+        self.path = path
+        self.source = source
+        self.profile_url_column = profile_url_column
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(CREATE_PROFILES_TABLE_QUERY)
+        self.connection.execute(CREATE_LAST_SEEN_INDEX_QUERY)
+        self.connection.commit()
+
+    def write_frame(self, df):
+        now = int(time.time() * 1000)
+        profiles = []
+        for row in get_json_records(df):
+            profile_key = get_profile_key_from_lk_url(row.get(self.profile_url_column))
+            if profile_key is None:
+                continue
+            profiles.append(
+                (
+                    profile_key,
+                    self.source,
+                    f"https://www.linkedin.com/in/{profile_key}",
+                    json.dumps(row, ensure_ascii=False),
+                    now,
+                    now,
+                )
+            )
+        self.connection.executemany(UPSERT_PROFILE_QUERY, profiles)
+
+    def checkpoint(self):
+        self.connection.commit()
+
+    def close(self):
+        self.connection.commit()
+        self.connection.close()
+
+    def get_profile(self, profile_key):
+        row = self.connection.execute(
+            "SELECT data, first_seen, last_seen FROM profiles WHERE profile_key = ?",
+            (profile_key,),
+        ).fetchone()
+        if row is None:
+            return None
+        return {**json.loads(row[0]), "first_seen": row[1], "last_seen": row[2]}
+
+    def get_profiles_frame(self, source=None, seen_since=None):
+        query = "SELECT profile_key, linkedin_url, data, first_seen, last_seen FROM profiles WHERE 1 = 1"
+        params = []
+        if source:
+            query += " AND source = ?"
+            params.append(source)
+        if seen_since:
+            query += " AND last_seen >= ?"
+            params.append(seen_since)
+        rows = self.connection.execute(query, params).fetchall()
+        return pd.DataFrame(
+            [
+                {
+                    "profile_key": profile_key,
+                    "linkedin_url": linkedin_url,
+                    **json.loads(data),
+                    "first_seen": first_seen,
+                    "last_seen": last_seen,
+                }
+                for profile_key, linkedin_url, data, first_seen, last_seen in rows
+            ]
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the stored profiles")
+    parser.add_argument(
+        "--store",
+        type=str,
+        help="Path to the SQLite profile store",
+        required=True,
+    )
+    parser.add_argument(
+        "--export",
+        type=str,
+        help="Path of the CSV file to export the profiles to",
+        required=True,
+    )
+    parser.add_argument(
+        "--source",
+        type=str,
+        help="Only export the profiles found by this scraper (lksn or lkr)",
+        required=False,
+        default=None,
+    )
+    parser.add_argument(
+        "--seen-since",
+        type=int,
+        help="Only export the profiles seen since this time (ms)",
+        required=False,
+        default=None,
+    )
+    args = parser.parse_args()
+
+    profile_store = ProfileStore(args.store)
+    df = profile_store.get_profiles_frame(args.source, args.seen_since)
+    profile_store.close()
+    df.to_csv(args.export, index=False)
+    print(f"Exported {len(df)} profiles to {args.export}")
@@ -0,0 +1,87 @@
+"""
+CPU and memory profiling of the parse phase of the search scrapers, page by page.
+
+The parsing of each page runs under cProfile and tracemalloc. For each page,
+<profile_dir>/page_<page>.pstats contains its profile (readable with pstats or snakeviz)
+and <profile_dir>/page_<page>_allocations.txt the lines that allocated the most memory.
+When the run is over, <profile_dir>/summary.txt aggregates the profiles of all the
+pages, so that a parsing slowdown can be traced back to a selector or a helper.
+
+When profiling is disabled, NULL_PROFILER is used: it only calls the parse function.
+"""
+import cProfile
+import io
+import os
+import pstats
+import tracemalloc
+
+TOP_FUNCTIONS = 25
+TOP_ALLOCATIONS = 15
+
+
+class ParseProfiler:
+    def __init__(self, profile_dir):
+        os.makedirs(profile_dir, exist_ok=True)
+        self.profile_dir = profile_dir
+        self.pstats_paths = []
+        self.peak_memory = {}
+
+    def run(self, page, function, *args, **kwargs):
+        profile = cProfile.Profile()
+        tracemalloc.start()
+        try:
+            result = profile.runcall(function, *args, **kwargs)
+            snapshot = tracemalloc.take_snapshot()
+            self.peak_memory[page] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        pstats_path = os.path.join(self.profile_dir, f"page_{page}.pstats")
+        profile.dump_stats(pstats_path)
+        self.pstats_paths.append(pstats_path)
+        self.write_allocations(page, snapshot)
+        return result
+
+    def write_allocations(self, page, snapshot):
+        snapshot = snapshot.filter_traces(
+            [
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            ]
+        )
+        path = os.path.join(self.profile_dir, f"page_{page}_allocations.txt")
+        with open(path, "w") as f:
+            f.write(f"Peak memory: {self.peak_memory[page] / 1024**2:.1f}MB\n")
+            for stat in snapshot.statistics("lineno")[:TOP_ALLOCATIONS]:
+                f.write(f"{stat}\n")
+
+    def close(self):
+        if not self.pstats_paths:
+            return
+        summary = io.StringIO()
+        stats = pstats.Stats(*self.pstats_paths, stream=summary)
+        summary.write(f"Parse profile of {len(self.pstats_paths)} pages\n")
+        peak_page = max(self.peak_memory, key=self.peak_memory.get)
+        summary.write(
+            f"Highest peak memory: {self.peak_memory[peak_page] / 1024**2:.1f}MB (page {peak_page})\n"
+        )
+        stats.sort_stats(pstats.SortKey.TIME).print_stats(TOP_FUNCTIONS)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(TOP_FUNCTIONS)
+        with open(os.path.join(self.profile_dir, "summary.txt"), "w") as f:
+            f.write(summary.getvalue())
+
+        print(f"Hottest functions of the parse phase ({len(self.pstats_paths)} pages):")
+        stats = pstats.Stats(*self.pstats_paths).strip_dirs()
+        stats.sort_stats(pstats.SortKey.TIME).print_stats(10)
+        print(f"Saved the profiles to {self.profile_dir}")
+
+
+class NullProfiler:
+    def run(self, page, function, *args, **kwargs):
+        return function(*args, **kwargs)
+
+    def close(self):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
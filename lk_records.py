@@ -0,0 +1,76 @@
+"""
+Compact rows for the search scrapers.
+
+A row is a Record: an object with one slot per field instead of a dict repeating the
+field names, which also behaves as a read-only mapping (row["name"], row.items(),
+dict(row), comparison with dicts). Each scraper defines its Record subclass with its
+fields, in the order of the exported columns.
+
+The rows kept in memory during a run are stored in a ResultTable, which keeps one list
+per column and converts to a DataFrame without building a dict per row. It is also a
+sequence of the records of its rows (iteration, len, table[i]), built when they are read,
+like the list of rows the scrapers used to return.
+"""
+from collections.abc import Mapping, Sequence
+import pandas as pd
+
+
+class Record(Mapping):
+    __slots__ = ()
+    FIELDS = ()
+
+    def __init__(self, *values):
+        if len(values) != len(self.FIELDS):
+            raise TypeError(
+                f"{type(self).__name__} takes {len(self.FIELDS)} values, got {len(values)}"
+            )
+        for field, value in zip(self.FIELDS, values):
+            setattr(self, field, value)
+
+    @classmethod
+    def from_mapping(cls, row):
+        return cls(*(row[field] for field in cls.FIELDS))
+
+    def __getitem__(self, key):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(self.FIELDS)
+
+    def __len__(self):
+        return len(self.FIELDS)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({dict(self)!r})"
+
+    def __reduce__(self):
+        # Sent to the parse worker processes as a tuple of values
+        return (type(self), tuple(getattr(self, field) for field in self.FIELDS))
+
+
+class ResultTable(Sequence):
+    def __init__(self, record_type):
+        self.record_type = record_type
+        self.fields = list(record_type.FIELDS)
+        self.columns = {field: [] for field in self.fields}
+
+    def extend(self, rows):
+        for field, column in self.columns.items():
+            column.extend(row[field] for row in rows)
+
+    def __len__(self):
+        return len(self.columns[self.fields[0]]) if self.fields else 0
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return self.record_type(*(self.columns[field][index] for field in self.fields))
+
+    def __iter__(self):
+        for values in zip(*self.columns.values()):
+            yield self.record_type(*values)
+
+    def to_dataframe(self):
+        return pd.DataFrame(self.columns, columns=self.fields)
@@ -0,0 +1,357 @@
+"""
+The run of the search scrapers, shared by Sales Navigator and Recruiter: loading the
+search pages, parsing them (in parse workers or in the browser), saving their rows page
+by page, resuming from the journal, stopping at the end of the results, and replaying
+snapshot archives.
+
+What differs between the scrapers is described by their PAGE_SCRAPER:
+- record: the Record subclass of their rows
+- results_per_page: the number of results of a full page
+- rendered_result_selector: the selector of the result cards once rendered
+- scroll_command: the script scrolling to the bottom of the results
+- total_results_selector: the selector of the total number of results of the search
+- parse_page_source: the rows of a page source (page_source, parser_backend, metrics=)
+- extract_in_browser: the rows of the current page, extracted in the browser (driver,
+  metrics=)
+- get_info_frame: the exported frame of a list of rows or a ResultTable
+"""
+import math
+import time
+from collections import deque
+from general_lk_utils import (
+    wait_for_results,
+    count_results,
+    get_lk_total_results,
+    print_lk_throughput,
+    create_parse_executor,
+    pop_parsed_pages,
+    print_page_network_stats,
+)
+from lk_html_backends import DEFAULT_PARSER_BACKEND
+from lk_metrics import NULL_METRICS, run_with_spans
+from lk_profiling import NULL_PROFILER
+from lk_records import ResultTable
+
+
+def load_search_page(
+    page_scraper,
+    driver,
+    url,
+    wait_after_page_loaded=3,
+    wait_after_scroll_down=2,
+    snapshot_archive=None,
+    network_stats=False,
+    metrics=NULL_METRICS,
+    get_page_source=True,
+    expected_count=None,
+    results_stable_time=0.5,
+):
+    # Without get_page_source (the results being extracted in the browser), the page
+    # source is only read to be captured, None is returned otherwise. expected_count is
+    # the number of results of the page when it is known (a full page by default).
+    if expected_count is None:
+        expected_count = page_scraper["results_per_page"]
+    print(f"Getting page {url}.")
+    with metrics.span("navigate"):
+        driver.get(url)
+    print(f"Waiting for the results (at most {wait_after_page_loaded}s)...")
+    with metrics.span("wait"):
+        waited_after_page_loaded = wait_for_results(
+            driver,
+            page_scraper["rendered_result_selector"],
+            wait_after_page_loaded,
+            expected_count=expected_count,
+            stable_time=results_stable_time,
+        )
+        count_before_scroll = count_results(
+            driver, page_scraper["rendered_result_selector"]
+        )
+
+    # Chrome must be unzoomed so that the whole page fits in the screen in 2 times
+    with metrics.span("scroll"):
+        try:
+            driver.execute_script(page_scraper["scroll_command"])
+        except:
+            print("There was an error scrolling down")
+    print(f"Waiting for the results (at most {wait_after_scroll_down}s)...")
+    with metrics.span("wait"):
+        # The results rendered by the scroll come after the ones already displayed
+        waited_after_scroll_down = wait_for_results(
+            driver,
+            page_scraper["rendered_result_selector"],
+            wait_after_scroll_down,
+            expected_count=expected_count,
+            stable_time=results_stable_time,
+            initial_count=count_before_scroll,
+        )
+    print(
+        f"Waited {waited_after_page_loaded:.1f}s after loading the page and {waited_after_scroll_down:.1f}s after scrolling down."
+    )
+    page_source = None
+    if get_page_source or snapshot_archive:
+        with metrics.span("page_source"):
+            page_source = driver.page_source
+    if network_stats:
+        print_page_network_stats(driver)
+    if snapshot_archive:
+        snapshot_archive.capture(url, page_source)
+    return page_source
+
+
+def save_info(page_scraper, info, total_info, result_writers):
+    # Without writers, the rows are kept in memory and returned at the end of the run
+    if not result_writers:
+        total_info.extend(info)
+        return
+    df = page_scraper["get_info_frame"](info)
+    for result_writer in result_writers:
+        result_writer.write_frame(df)
+        result_writer.checkpoint()
+
+
+def save_page(
+    page_scraper,
+    page,
+    info,
+    total_info,
+    result_writers,
+    journal=None,
+    metrics=NULL_METRICS,
+):
+    with metrics.span("write", page):
+        if journal and not journal.has_page(page):
+            journal.record_page(page, info)
+        save_info(page_scraper, info, total_info, result_writers)
+    metrics.end_page(page, len(info))
+
+
+def scrap_search_pages(
+    page_scraper,
+    driver,
+    page_list,
+    get_search_url,
+    wait_time_between_pages=3,
+    wait_after_page_loaded=3,
+    wait_after_scroll_down=2,
+    parser_backend=DEFAULT_PARSER_BACKEND,
+    snapshot_archive=None,
+    parse_workers=0,
+    parse_pool="thread",
+    result_writers=(),
+    journal=None,
+    network_stats=False,
+    metrics=NULL_METRICS,
+    profiler=NULL_PROFILER,
+    extract_in_browser=False,
+    results_stable_time=0.5,
+):
+    record = page_scraper["record"]
+    results_per_page = page_scraper["results_per_page"]
+    total_info = ResultTable(record)
+    n_pages = len(page_list)
+    # With parse workers, a page is parsed while the browser loads the next ones. There
+    # is nothing to parse when the results are extracted in the browser.
+    parse_executor = (
+        None if extract_in_browser else create_parse_executor(parse_workers, parse_pool)
+    )
+    pending_pages = deque()
+    # The number of results of each saved page
+    saved_pages = {}
+    # Known once the total number of results is read on the first page loaded
+    total_results = None
+    last_page = None
+    n_loaded_pages = 0
+    start_time = time.time()
+
+    def save_parsed_pages(parsed_pages):
+        for page, info in parsed_pages:
+            saved_pages[page] = len(info)
+            if not is_incomplete_page(page):
+                save_page(
+                    page_scraper,
+                    page,
+                    info,
+                    total_info,
+                    result_writers,
+                    journal,
+                    metrics,
+                )
+                continue
+            # Its rows are saved, but it isn't journaled so that --resume loads it again
+            print(
+                f"Page {page} has only {len(info)} results out of {results_per_page}, although the search has {last_page} pages: it may not have been fully loaded."
+            )
+            save_page(
+                page_scraper, page, info, total_info, result_writers, metrics=metrics
+            )
+            if journal:
+                journal.record_incomplete_page(page)
+
+    def is_incomplete_page(page):
+        # A page that isn't full before the last page of the search
+        return (
+            saved_pages[page] < results_per_page
+            and last_page is not None
+            and page < last_page
+        )
+
+    def get_end_page():
+        # A page that isn't full is the last one, unless the total number of results
+        # says that more pages remain (a slow render, a rate limit or a timeout)
+        for page, n in saved_pages.items():
+            if n < results_per_page and (last_page is None or page >= last_page):
+                return page
+        return None
+
+    try:
+        for i, p in enumerate(page_list):
+            end_page = get_end_page()
+            if end_page is not None:
+                print(
+                    f"Page {end_page} has less than {results_per_page} results, it is the last page of the search."
+                )
+                break
+            if last_page is not None and p > last_page:
+                print(f"The search has no results after page {last_page}.")
+                break
+
+            if journal and journal.has_page(p):
+                print(f"Page {p} was already scraped, getting it from the journal.")
+                # The pages being parsed come first to keep the order of the pages
+                parsed_pages = pop_parsed_pages(
+                    pending_pages, wait=True, metrics=metrics
+                )
+                parsed_pages.append(
+                    (p, [record.from_mapping(row) for row in journal.get_rows(p)])
+                )
+                save_parsed_pages(parsed_pages)
+                continue
+
+            print(f"Waiting for {wait_time_between_pages}s...")
+            time.sleep(wait_time_between_pages)
+
+            print(f"Getting new page: {p} ({i + 1}/{n_pages}).")
+            metrics.page = p
+            page_source = load_search_page(
+                page_scraper,
+                driver,
+                get_search_url(p),
+                wait_after_page_loaded=wait_after_page_loaded,
+                wait_after_scroll_down=wait_after_scroll_down,
+                snapshot_archive=snapshot_archive,
+                network_stats=network_stats,
+                metrics=metrics,
+                get_page_source=not extract_in_browser,
+                # The last page of the search isn't full
+                expected_count=(
+                    None
+                    if total_results is None
+                    else min(
+                        results_per_page, total_results - (p - 1) * results_per_page
+                    )
+                ),
+                results_stable_time=results_stable_time,
+            )
+            n_loaded_pages += 1
+            if n_loaded_pages == 1:
+                total_results = get_lk_total_results(
+                    driver, page_scraper["total_results_selector"]
+                )
+                if total_results is not None:
+                    last_page = math.ceil(total_results / results_per_page)
+                    n_pages = len([page for page in page_list if page <= last_page])
+                    print(
+                        f"The search has {total_results} results ({last_page} pages)."
+                    )
+                else:
+                    print(
+                        f"The total number of results wasn't found ({page_scraper['total_results_selector']}), the search ends at the first page with less than {results_per_page} results."
+                    )
+            if extract_in_browser:
+                parsed_pages = [
+                    (
+                        p,
+                        profiler.run(
+                            p,
+                            page_scraper["extract_in_browser"],
+                            driver,
+                            metrics=metrics,
+                        ),
+                    )
+                ]
+            elif parse_executor:
+                pending_pages.append(
+                    (
+                        p,
+                        parse_executor.submit(
+                            run_with_spans,
+                            page_scraper["parse_page_source"],
+                            p,
+                            metrics.enabled,
+                            page_source,
+                            parser_backend,
+                        ),
+                    )
+                )
+                parsed_pages = pop_parsed_pages(pending_pages, metrics=metrics)
+            else:
+                parsed_pages = [
+                    (
+                        p,
+                        profiler.run(
+                            p,
+                            page_scraper["parse_page_source"],
+                            page_source,
+                            parser_backend,
+                            metrics=metrics,
+                        ),
+                    )
+                ]
+            save_parsed_pages(parsed_pages)
+
+        if parse_executor:
+            save_parsed_pages(
+                pop_parsed_pages(pending_pages, wait=True, metrics=metrics)
+            )
+    except BaseException:
+        # The pages already parsed are still saved and journaled, so that --resume
+        # doesn't load them again
+        if parse_executor:
+            save_parsed_pages(pop_parsed_pages(pending_pages, metrics=metrics))
+        raise
+    finally:
+        if parse_executor:
+            parse_executor.shutdown(cancel_futures=True)
+    print(f"Saved {len(saved_pages)} pages ({sum(saved_pages.values())} results).")
+    if n_loaded_pages:
+        print_lk_throughput(n_loaded_pages, time.time() - start_time)
+    return total_info
+
+
+def replay_snapshot_archive(
+    page_scraper,
+    snapshot_archive,
+    parser_backend=DEFAULT_PARSER_BACKEND,
+    result_writers=(),
+    metrics=NULL_METRICS,
+    profiler=NULL_PROFILER,
+):
+    total_info = ResultTable(page_scraper["record"])
+    # The rows are dated with the capture of their page, when they have a date
+    has_time_scraped = "time_scraped" in page_scraper["record"].FIELDS
+    for i, (entry, page_source) in enumerate(snapshot_archive.iter_pages()):
+        print(f"Replaying page {entry['url']}.")
+        # The pages of the archive are numbered in the order they were captured
+        metrics.page = i + 1
+        info = profiler.run(
+            i + 1,
+            page_scraper["parse_page_source"],
+            page_source,
+            parser_backend,
+            metrics=metrics,
+            **({"time_scraped": entry["time_captured"]} if has_time_scraped else {}),
+        )
+        save_page(
+            page_scraper, i + 1, info, total_info, result_writers, metrics=metrics
+        )
+    return total_info
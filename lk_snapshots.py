@@ -0,0 +1,57 @@
+"""
+Archive of the search pages loaded by the scrapers, so that the extraction can be run
+again from it without a browser (e.g. after fixing a selector).
+
+An archive is a directory containing:
+- pages/<sha256>.html.gz: the gzip-compressed page sources, named after the hash of
+  their content so that identical pages are only stored once
+- index.jsonl: one line per captured page, in the order they were captured, with the
+  url, the time of the capture (ms) and the hash of the page source
+"""
+import gzip
+import hashlib
+import json
+import os
+import time
+
+SNAPSHOT_INDEX_FILE_NAME = "index.jsonl"
+SNAPSHOT_PAGES_DIR_NAME = "pages"
+
+
+class SnapshotArchive:
+    def __init__(self, path):
+        self.path = path
+        self.index_path = os.path.join(path, SNAPSHOT_INDEX_FILE_NAME)
+        self.pages_path = os.path.join(path, SNAPSHOT_PAGES_DIR_NAME)
+
+    def get_page_path(self, sha256):
+        return os.path.join(self.pages_path, f"{sha256}.html.gz")
+
+    def capture(self, url, page_source):
+        os.makedirs(self.pages_path, exist_ok=True)
+        content = page_source.encode("utf-8")
+        sha256 = hashlib.sha256(content).hexdigest()
+
+        page_path = self.get_page_path(sha256)
+        if not os.path.exists(page_path):
+            # Written under a temporary name first so that a page file is never partial
+            with gzip.open(f"{page_path}.tmp", "wb") as f:
+                f.write(content)
+            os.replace(f"{page_path}.tmp", page_path)
+
+        entry = {"url": url, "time_captured": int(time.time() * 1000), "sha256": sha256}
+        with open(self.index_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+        return entry
+
+    def get_entries(self):
+        with open(self.index_path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def read_page_source(self, entry):
+        with gzip.open(self.get_page_path(entry["sha256"]), "rb") as f:
+            return f.read().decode("utf-8")
+
+    def iter_pages(self):
+        for entry in self.get_entries():
+            yield entry, self.read_page_source(entry)
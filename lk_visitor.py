@@ -6,31 +6,102 @@ Example usage:
 python lk_visitor.py --profile_file ./profiles.csv --shortest_wait_time 4 --longest_wait_time 7 --page_load_time 3
 """
 
-import argparse
-import logging
+import sys
 import time
 import random
-import pandas as pd
 from tqdm import tqdm
 from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.by import By
+from lk_metrics import NULL_METRICS
 from general_lk_utils import (
-    get_lk_credentials,
-    enter_ids_on_lk_signin,
+    print_page_network_stats,
+    normalize_lk_profile_url,
+    rebase_lk_url,
 )
 
+PROFILE_URL_COLUMN = "linkedin_url"
+# The number of rows of the profile file read at once
+PROFILE_FILE_CHUNK_SIZE = 10000
 
-LK_CREDENTIALS_PATH = "./lk_credentials.json"
 
-
-def visit_pages(browser, wait_time, urls, action=None):
-    for url in tqdm(urls):
-        browser.get(url)
-        time.sleep(wait_time)
+def read_profile_urls(profile_file, chunk_size=PROFILE_FILE_CHUNK_SIZE):
+    # The urls of the profile file, read by chunks of rows so that the whole file is
+    # never in memory
+    if profile_file.endswith(".csv"):
+        import pandas as pd
+
+        with pd.read_csv(
+            profile_file,
+            usecols=[PROFILE_URL_COLUMN],
+            dtype=str,
+            chunksize=chunk_size,
+        ) as chunks:
+            for chunk in chunks:
+                yield from chunk[PROFILE_URL_COLUMN]
+    else:
+        # ends with .xlsx
+        import openpyxl
+
+        workbook = openpyxl.load_workbook(profile_file, read_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = next(rows, ())
+            if PROFILE_URL_COLUMN not in header:
+                raise ValueError(
+                    f"{profile_file} has no column named '{PROFILE_URL_COLUMN}'"
+                )
+            url_index = header.index(PROFILE_URL_COLUMN)
+            for row in rows:
+                yield row[url_index] if url_index < len(row) else None
+        finally:
+            workbook.close()
+
+
+def get_urls_to_visit(urls, base_url=None):
+    # The normalized urls, without the empty ones and the duplicates, in the order of the
+    # file
+    urls_to_visit = {}
+    for url in urls:
+        url = normalize_lk_profile_url(url)
+        if url is not None:
+            urls_to_visit[url] = None
+    return [rebase_lk_url(url, base_url) for url in urls_to_visit]
+
+
+def visit_pages(
+    browser,
+    wait_time,
+    urls,
+    action=None,
+    network_stats=False,
+    metrics=NULL_METRICS,
+    journal=None,
+):
+    # The urls already in the journal were visited by a previous run. They are recorded
+    # normalized, so that they are the same whatever the server (see rebase_lk_url).
+    if journal is not None:
+        n_urls = len(urls)
+        urls = [
+            url for url in urls if not journal.has_url(normalize_lk_profile_url(url))
+        ]
+        if len(urls) < n_urls:
+            print(f"Skipping {n_urls - len(urls)} profiles already visited.")
+    for i, url in enumerate(tqdm(urls)):
+        metrics.page = i + 1
+        with metrics.span("navigate"):
+            browser.get(url)
+        with metrics.span("wait"):
+            time.sleep(wait_time)
         if action:
-            action(browser)
+            with metrics.span("action"):
+                action(browser)
+        if network_stats:
+            print_page_network_stats(browser)
+        if journal is not None:
+            journal.record_url(normalize_lk_profile_url(url))
+        metrics.end_page(i + 1, 1)
+    return len(urls)
 
 
 def move_mouse(browser, x, y):
@@ -66,75 +137,7 @@ def action_on_page_visit(driver, shortest_wait_time, longest_wait_time):
 
 
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="Visit profiles on LinkedIn")
-    parser.add_argument(
-        "--profile_file",
-        type=str,
-        help="Path to the file containing the profiles to visit (accepts .csv and .xlsx as long as it has a column named 'linkedin_url')",
-        required=True,
-    )
-    parser.add_argument(
-        "--shortest_wait_time",
-        type=int,
-        help="Shortest wait time in seconds between actions",
-        required=False,
-        default=4,
-    )
-    parser.add_argument(
-        "--longest_wait_time",
-        type=int,
-        help="Longest wait time in seconds between actions",
-        required=False,
-        default=7,
-    )
-    parser.add_argument(
-        "--page_load_time",
-        type=int,
-        help="Time to wait in seconds for page to load",
-        required=False,
-        default=3,
-    )
-    args = parser.parse_args()
-
-    # Get the arguments
-    profile_file = args.profile_file
-    shortest_wait_time = args.shortest_wait_time
-    longest_wait_time = args.longest_wait_time
-    page_load_time = args.page_load_time
-
-    profiles_df = []
-    # Read the profile file
-    if profile_file.endswith(".csv"):
-        profiles_df = pd.read_csv(profile_file)
-    else:
-        # ends with .xlsx
-        profiles_df = pd.read_excel(profile_file)
-
-    profile_urls = profiles_df["linkedin_url"].tolist()
-    print(f"Found {len(profile_urls)} profile urls.")
-
-    print("Starting the driver...")
-    logging.getLogger("selenium").setLevel(logging.CRITICAL)
-    # Start the webdriver without any logs
-    driver = webdriver.Chrome(options=Options())
-    driver.maximize_window()
-    driver.get("https://www.linkedin.com/login/")
-
-    print("Inputting the credentials...")
-    lk_credentials = get_lk_credentials(LK_CREDENTIALS_PATH)
-    enter_ids_on_lk_signin(driver, lk_credentials["email"], lk_credentials["password"])
-
-    if "checkpoint/challenge" in driver.current_url:
-        print(
-            "It looks like you need to complete a double factor authentification. Please do so and press enter when you are done."
-        )
-        input()
-    visit_pages(
-        driver,
-        page_load_time,
-        profile_urls,
-        lambda browser: action_on_page_visit(
-            browser, shortest_wait_time, longest_wait_time
-        ),
-    )
-    driver.close()
+    # The options and the run are shared by all the tools (see lk_cli.py)
+    from lk_cli import main
+
+    main(["visit", *sys.argv[1:]])
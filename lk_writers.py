@@ -0,0 +1,235 @@
+"""
+Writers saving the rows of the search scrapers page by page, so that a run never has to
+be held in memory.
+
+The rows are appended to <path>.part. At each checkpoint the file is flushed and
+fsynced, and the number of rows and bytes written so far is saved to
+<path>.checkpoint.json (written to a temporary file first, then renamed atomically):
+if the run crashes, anything after the committed size can be truncated. When the
+writer is closed, <path>.part is atomically renamed to <path>. The files of a writer
+that was never closed are removed by remove_partial_files (when the run is resumed).
+
+Parquet files are written with an explicit schema, built from the column types of the
+scraper ("string", "bool", "int64" or "category" for dictionary-encoded columns). A
+Parquet file can only be read once closed, and its rows are grouped in row groups of
+PARQUET_ROW_GROUP_SIZE rows, so it is only readable at the end of the run (the journal
+of the run is what allows to resume it).
+
+Excel files are written with openpyxl in write-only mode: the rows are streamed to a
+temporary file as the pages are saved, with one typed cell per column (numbers,
+booleans, text, empty for the missing values) in the order of the scraper columns, and
+the workbook is only assembled when the writer is closed. The pages are converted to
+cells by batches of XLSX_BATCH_SIZE rows, as converting each page on its own costs
+about as much as a batch. Like Parquet files, they are only readable at the end of the
+run.
+"""
+import csv
+import json
+import os
+from abc import ABC, abstractmethod
+
+PARQUET_ROW_GROUP_SIZE = 10000
+XLSX_BATCH_SIZE = 1000
+
+
+class ResultWriter(ABC):
+    def __init__(self, path):
+        self.path = path
+        self.part_path = f"{path}.part"
+        self.checkpoint_path = f"{path}.checkpoint.json"
+        self.f = self.open_part_file()
+        self.columns = None
+        self.n_rows = 0
+
+    def open_part_file(self):
+        return open(self.part_path, "w", newline="", encoding="utf-8")
+
+    def write_frame(self, df):
+        if len(df) == 0:
+            return
+        if self.columns is None:
+            self.columns = list(df.columns)
+        self.write_rows(df.reindex(columns=self.columns))
+        self.n_rows += len(df)
+
+    @abstractmethod
+    def write_rows(self, df):
+        pass
+
+    def checkpoint(self):
+        self.f.flush()
+        os.fsync(self.f.fileno())
+        state = {"rows": self.n_rows, "bytes": os.fstat(self.f.fileno()).st_size}
+        with open(f"{self.checkpoint_path}.tmp", "w") as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(f"{self.checkpoint_path}.tmp", self.checkpoint_path)
+
+    def close(self):
+        self.checkpoint()
+        self.f.close()
+        os.replace(self.part_path, self.path)
+        os.remove(self.checkpoint_path)
+
+
+class CsvResultWriter(ResultWriter):
+    def __init__(self, path, column_types=None):
+        super().__init__(path)
+        # The header of a file without rows, the columns of the scraper being in the
+        # order of its frames
+        self.header = list(column_types) if column_types else None
+
+    def write_rows(self, df):
+        df.to_csv(self.f, header=self.n_rows == 0, index=False)
+
+    def close(self):
+        if self.n_rows == 0 and self.header:
+            csv.writer(self.f, lineterminator="\n").writerow(self.header)
+        super().close()
+
+
+def get_json_records(df):
+    # The missing values (NaN, NA) of the columns are null in JSON
+    return df.astype(object).where(df.notna(), None).to_dict(orient="records")
+
+
+def get_cell_rows(df):
+    # The rows as tuples of Python values, the missing values (NaN, NA) being None
+    values = df.astype(object).to_numpy()
+    values[df.isna().to_numpy()] = None
+    return map(tuple, values)
+
+
+class JsonlResultWriter(ResultWriter):
+    def write_rows(self, df):
+        for row in get_json_records(df):
+            self.f.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+
+def get_arrow_schema(column_types):
+    import pyarrow as pa
+
+    arrow_types = {
+        "string": pa.string(),
+        "bool": pa.bool_(),
+        "int64": pa.int64(),
+        "category": pa.dictionary(pa.int32(), pa.string()),
+    }
+    return pa.schema(
+        [
+            (column, arrow_types[column_type])
+            for column, column_type in column_types.items()
+        ]
+    )
+
+
+class ParquetResultWriter(ResultWriter):
+    def __init__(self, path, column_types):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError(
+                "Saving to parquet requires pyarrow (pip install pyarrow)"
+            )
+        super().__init__(path)
+        self.schema = get_arrow_schema(column_types)
+        # The columns are the ones of the schema, in its order
+        self.columns = self.schema.names
+        self.parquet_writer = pq.ParquetWriter(self.f, self.schema)
+        self.pending_tables = []
+        self.n_pending_rows = 0
+
+    def open_part_file(self):
+        return open(self.part_path, "wb")
+
+    def write_rows(self, df):
+        import pyarrow as pa
+
+        self.pending_tables.append(
+            pa.Table.from_pandas(df, schema=self.schema, preserve_index=False)
+        )
+        self.n_pending_rows += len(df)
+        if self.n_pending_rows >= PARQUET_ROW_GROUP_SIZE:
+            self.write_row_group()
+
+    def write_row_group(self):
+        import pyarrow as pa
+
+        if self.pending_tables:
+            self.parquet_writer.write_table(pa.concat_tables(self.pending_tables))
+        self.pending_tables = []
+        self.n_pending_rows = 0
+
+    def close(self):
+        self.write_row_group()
+        self.parquet_writer.close()
+        super().close()
+
+
+class XlsxResultWriter(ResultWriter):
+    def __init__(self, path, column_types):
+        try:
+            import openpyxl
+        except ImportError:
+            raise ImportError("Saving to xlsx requires openpyxl (pip install openpyxl)")
+        super().__init__(path)
+        # The columns are the ones of the scraper, in the order of the csv files
+        self.columns = list(column_types)
+        self.workbook = openpyxl.Workbook(write_only=True)
+        self.worksheet = self.workbook.create_sheet("Sheet1")
+        self.worksheet.append(self.columns)
+        self.pending_frames = []
+        self.n_pending_rows = 0
+
+    def open_part_file(self):
+        return open(self.part_path, "wb")
+
+    def write_rows(self, df):
+        self.pending_frames.append(df)
+        self.n_pending_rows += len(df)
+        if self.n_pending_rows >= XLSX_BATCH_SIZE:
+            self.write_batch()
+
+    def write_batch(self):
+        import pandas as pd
+
+        if self.pending_frames:
+            df = pd.concat(self.pending_frames, ignore_index=True)
+            for row in get_cell_rows(df):
+                self.worksheet.append(row)
+        self.pending_frames = []
+        self.n_pending_rows = 0
+
+    def close(self):
+        self.write_batch()
+        self.workbook.save(self.f)
+        super().close()
+
+
+RESULT_WRITERS = {
+    "csv": CsvResultWriter,
+    "jsonl": JsonlResultWriter,
+    "parquet": ParquetResultWriter,
+    "xlsx": XlsxResultWriter,
+}
+
+
+def remove_partial_files(path):
+    # The files left by a writer of path that was never closed (the run crashed)
+    removed_paths = []
+    for partial_path in (
+        f"{path}.part",
+        f"{path}.checkpoint.json",
+        f"{path}.checkpoint.json.tmp",
+    ):
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+            removed_paths.append(partial_path)
+    return removed_paths
+
+
+def create_result_writer(path, save_format, column_types=None):
+    if save_format in ("csv", "parquet", "xlsx"):
+        return RESULT_WRITERS[save_format](path, column_types)
+    return RESULT_WRITERS[save_format](path)
@@ -1,22 +1,25 @@
-import argparse
-import os
-import logging
-from bs4 import BeautifulSoup
-from tqdm import tqdm
-import time
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-import pandas as pd
-from general_lk_utils import (
-    remove_url_parameter,
-    get_lk_credentials,
-    enter_ids_on_lk_signin,
-    select_contract_lk,
+import sys
+from general_lk_utils import normalize_lk_profiles, RECRUITER_PROFILE_ID_PATTERN
+from lk_html_backends import (
+    DEFAULT_PARSER_BACKEND,
+    parse_html,
+    free_html,
+    compile_selector,
 )
+from lk_browser_extraction import extract_results_in_browser, check_extraction_spec
+from lk_metrics import NULL_METRICS
+from lk_records import Record, ResultTable
+from lk_search import load_search_page, scrap_search_pages
 
-LK_CREDENTIALS_PATH = "./lk_credentials.json"
+JOURNAL_DIR = "./lkr_data/journal/"
 SCROLL_TO_BOTTOM_COMMAND = "window.scrollTo(0, document.body.scrollHeight);"
 
+# The only part of the page that is parsed
+RESULTS_CONTAINER_ID = "results-container"
+# The total number of results of the search, above the results. Unverified: it was
+# written for the pages of lk_fixtures.py and hasn't been checked on the real pages. When
+# it matches nothing, the end of the search is only detected by a short page.
+TOTAL_RESULTS_SELECTOR = "span.profile-list__total"
 RESULT_SELECTOR = "#results-container > span > div > form > ol > li > div > article > div > div > article > div > div.row__card"
 IN_RESULT_NAME_SELECTOR = "div.row__top-card > section > div > div.artdeco-entity-lockup__content.lockup__content.ember-view > span > span:nth-child(1) > div > a"
 IN_RESULT_ROLE_SELECTOR = "div.row__top-card > section > div > div.artdeco-entity-lockup__content.lockup__content.ember-view > div.artdeco-entity-lockup__subtitle.ember-view"
@@ -37,57 +40,103 @@ RESULT_PARSE_INSTRUCTIONS = [
         "selector": IN_RESULT_NAME_SELECTOR,
         "depth_in_selector": 0,
         "parse_function": lambda x: x.text.strip(),
+        "browser_value": "text",
     },
     {
         "name": "recruiter_link",
         "selector": IN_RESULT_NAME_SELECTOR,
         "depth_in_selector": 0,
         "parse_function": lambda x: x.get("href"),
-    },
-    {
-        "name": "linkedin_link",
-        "selector": IN_RESULT_NAME_SELECTOR,
-        "depth_in_selector": 0,
-        "parse_function": lambda x: x.get("href").replace("talent/profile", "in"),
+        "browser_value": "@href",
     },
     {
         "name": "role",
         "selector": IN_RESULT_ROLE_SELECTOR,
         "depth_in_selector": 0,
         "parse_function": lambda x: x.text.strip(),
+        "browser_value": "text",
     },
     {
         "name": "location",
         "selector": IN_RESULT_LOCATION_SELECTOR,
         "depth_in_selector": 0,
         "parse_function": lambda x: x.text.strip(),
+        "browser_value": "text",
     },
     {
         "name": "industry",
         "selector": IN_RESULT_INDUSTRY_SELECTOR,
         "depth_in_selector": 0,
         "parse_function": lambda x: x.text.strip(),
+        "browser_value": "text",
     },
     {
         "name": "education",
         "selector": IN_RESULT_EDUCATION_SELECTOR,
         "depth_in_selector": 0,
         "parse_function": lambda x: x.text.strip(),
+        "browser_value": "text",
     },
     {
         "name": "education_year",
         "selector": IN_RESULT_EDUCATION_YEAR_SELECTOR,
         "depth_in_selector": 0,
         "parse_function": lambda x: x.text.strip(),
+        "browser_value": "text",
     },
     {
         "name": "skill_match",
         "selector": IN_RESULT_SKILL_MATCH,
         "depth_in_selector": 0,
         "parse_function": lambda x: x.text.strip(),
+        "browser_value": "text",
     },
 ]
 
+# Types of the exported columns, used for typed formats (parquet)
+RESULT_COLUMN_TYPES = {
+    "name": "string",
+    "recruiter_link": "string",
+    "linkedin_link": "string",
+    "role": "string",
+    "location": "category",
+    "industry": "category",
+    "education": "string",
+    "education_year": "string",
+    "skill_match": "string",
+    "linkedin_url": "string",
+    "lead_id": "string",
+}
+
+
+class LkrRecord(Record):
+    # The columns of RESULT_COLUMN_TYPES but linkedin_link, linkedin_url and lead_id,
+    # which are derived when exporting (see get_info_frame)
+    __slots__ = FIELDS = tuple(
+        instruction["name"] for instruction in RESULT_PARSE_INSTRUCTIONS
+    )
+
+
+# RESULT_PARSE_INSTRUCTIONS read in the browser, their browser_value being the value
+# their parse_function takes from the element (see lk_browser_extraction.py). The
+# instructions using all the elements of their selector (depth_in_selector -1) can't be.
+RESULT_BROWSER_EXTRACTION_SPEC = {
+    "cards_selector": RESULT_SELECTOR,
+    "columns": [
+        {
+            "select": instruction["selector"],
+            "index": instruction["depth_in_selector"],
+            "value": instruction["browser_value"],
+            "default": "",
+        }
+        for instruction in RESULT_PARSE_INSTRUCTIONS
+    ],
+}
+check_extraction_spec(RESULT_BROWSER_EXTRACTION_SPEC)
+
+# RESULT_PARSE_INSTRUCTIONS compiled for each parser backend (see get_parse_plan)
+RESULT_PARSE_PLANS = {}
+
 NUMBER_OF_LEADS_PER_PAGE = 25
 
 
@@ -96,200 +145,149 @@ def get_search_url(search_url_base, start=1):
     return url
 
 
-def parse_search_result(result_el, instructions):
-    r = {}
-    for instruction in instructions:
-        r[instruction["name"]] = ""
-        els = result_el.select(instruction["selector"])
-
-        if (
-            instruction["depth_in_selector"] >= 0
-            and len(els) > instruction["depth_in_selector"]
-        ):
-            r[instruction["name"]] = instruction["parse_function"](
-                els[instruction["depth_in_selector"]]
+def compile_parse_instructions(instructions, parser_backend=DEFAULT_PARSER_BACKEND):
+    # The instructions sharing a selector are grouped so that it is evaluated once per
+    # card, and the selectors are compiled once for all the cards. A selector is only
+    # evaluated up to its first match when all its instructions use the first one.
+    groups = {}
+    for index, instruction in enumerate(instructions):
+        groups.setdefault(instruction["selector"], []).append((index, instruction))
+    return {
+        "n_fields": len(instructions),
+        "steps": [
+            (
+                compile_selector(selector, parser_backend),
+                all(
+                    instruction["depth_in_selector"] == 0
+                    for _, instruction in selector_instructions
+                ),
+                selector_instructions,
             )
+            for selector, selector_instructions in groups.items()
+        ],
+    }
 
-        elif instruction["depth_in_selector"] == -1:
-            r[instruction["name"]] = instruction["parse_function"](els)
-    return r
 
-
-def get_search_result_els(page_source):
-    soup = BeautifulSoup(page_source, "html.parser")
-    all_results_el = soup.select(RESULT_SELECTOR)
+def get_parse_plan(parser_backend=DEFAULT_PARSER_BACKEND):
+    if parser_backend not in RESULT_PARSE_PLANS:
+        RESULT_PARSE_PLANS[parser_backend] = compile_parse_instructions(
+            RESULT_PARSE_INSTRUCTIONS, parser_backend
+        )
+    return RESULT_PARSE_PLANS[parser_backend]
+
+
+def parse_search_result(result_el, plan):
+    # The fields are in the order of the instructions, whatever the order of the steps
+    values = [""] * plan["n_fields"]
+    for selector, first_only, instructions in plan["steps"]:
+        if first_only:
+            el = result_el.select_one(selector)
+            els = [] if el is None else [el]
+        else:
+            els = result_el.select(selector)
+
+        for index, instruction in instructions:
+            if (
+                instruction["depth_in_selector"] >= 0
+                and len(els) > instruction["depth_in_selector"]
+            ):
+                values[index] = instruction["parse_function"](
+                    els[instruction["depth_in_selector"]]
+                )
+
+            elif instruction["depth_in_selector"] == -1:
+                values[index] = instruction["parse_function"](els)
+    return LkrRecord(*values)
+
+
+def get_search_result_els(page_source, parser_backend=DEFAULT_PARSER_BACKEND):
+    soup = parse_html(page_source, parser_backend, container_id=RESULTS_CONTAINER_ID)
+    all_results_el = soup.select(compile_selector(RESULT_SELECTOR, parser_backend))
     return all_results_el
 
 
-def parse_search_page(page_source):
-    all_results_el = get_search_result_els(page_source)
+def parse_search_page(
+    page_source, parser_backend=DEFAULT_PARSER_BACKEND, metrics=NULL_METRICS
+):
+    with metrics.span("parse"):
+        all_results_el = get_search_result_els(page_source, parser_backend)
     print(f"Found {len(all_results_el)} results.")
-    return [
-        parse_search_result(result_el, RESULT_PARSE_INSTRUCTIONS)
-        for result_el in all_results_el
-    ]
+    plan = get_parse_plan(parser_backend)
+    with metrics.span("extract", results=len(all_results_el)):
+        rows = [parse_search_result(result_el, plan) for result_el in all_results_el]
+    if all_results_el:
+        free_html(all_results_el[0])
+    return rows
 
 
-def parse_search_url(url, driver, wait_after_page_loaded=5):
-    print(f"Getting and parsing page {url}.")
-    driver.get(url)
-    time.sleep(wait_after_page_loaded)
-    try:
-        driver.execute_script(SCROLL_TO_BOTTOM_COMMAND)
-    except:
-        print("There was an error scrolling down")
-    return parse_search_page(driver.page_source)
+def parse_search_page_in_browser(driver, metrics=NULL_METRICS):
+    # The same rows as parse_search_page, extracted from the current page in the browser
+    with metrics.span("extract"):
+        rows = extract_results_in_browser(driver, RESULT_BROWSER_EXTRACTION_SPEC)
+    print(f"Found {len(rows)} results.")
+    return [LkrRecord(*values) for values in rows]
 
 
-def scrap_lkr_pages(
+def parse_search_url(
+    url,
     driver,
-    page_list,
-    get_search_url,
-    backups="./backups/",
-    wait_time_between_pages=3,
-    wait_after_page_loaded=3,
+    wait_after_page_loaded=5,
     wait_after_scroll_down=2,
+    parser_backend=DEFAULT_PARSER_BACKEND,
+    snapshot_archive=None,
+    network_stats=False,
+    metrics=NULL_METRICS,
 ):
-    total_info = []
-    n_pages = len(page_list)
-    for i in range(n_pages):
-        p = page_list[i]
-        print("-----------")
-        print(f"Waiting for {wait_time_between_pages}s...")
-        time.sleep(wait_time_between_pages)
-
-        print(f"Getting new page: {p}, ({i+1}/{n_pages}).")
-        info = parse_search_url(
-            get_search_url(page=p),
-            driver,
-            wait_after_page_loaded=wait_after_page_loaded,
-            wait_after_scroll_down=wait_after_scroll_down,
-        )
-        total_info += info
-        print("-----------")
-        if backups:
-            df = pd.DataFrame(total_info)
-            df.to_csv(
-                f"{backups}{str(int(time.time()*1000))}_lk_recruiter_search_export_{i+1}_on_{n_pages}.csv",
-                index=False,
-            )
-    return total_info
-
-
-if __name__ == "__main__":
-    # Parse the arguments
-    parser = argparse.ArgumentParser(description="Scrap LinkedIn Recruiter")
-    parser.add_argument(
-        "--search-url",
-        type=str,
-        help="The url of the search page to scrap",
-        required=True,
-    )
-    parser.add_argument(
-        "--start",
-        type=int,
-        help="The profile number to start scrapping from",
-        required=False,
-        default=1,
-    )
-    parser.add_argument(
-        "--end",
-        type=int,
-        help="The profile number to end scrapping at",
-        required=False,
-        default=1,
-    )
-    parser.add_argument(
-        "--wait-time-between-pages",
-        type=int,
-        help="The time in seconds to wait between pages",
-        required=False,
-        default=5,
-    )
-    parser.add_argument(
-        "--wait-after-page-loaded",
-        type=int,
-        help="The time in seconds to wait after the page is loaded",
-        required=False,
-        default=3,
-    )
-    parser.add_argument(
-        "--wait-after-scroll-down",
-        type=int,
-        help="The time in seconds to wait after scrolling down",
-        required=False,
-        default=3,
-    )
-    parser.add_argument(
-        "--save-format",
-        type=str,
-        help="The format to save the data in (xlsx or csv)",
-        required=False,
-        default="csv",
-    )
-    args = parser.parse_args()
-
-    # Get the arguments
-    search_url = args.search_url
-    start = args.start
-    end = args.end
-    wait_time_between_pages = args.wait_time_between_pages
-    wait_after_page_loaded = args.wait_after_page_loaded
-    wait_after_scroll_down = args.wait_after_scroll_down
-    save_format = args.save_format
-    search_url_base = remove_url_parameter(search_url, "start")
-
-    print("Starting the driver...")
-    logging.getLogger("selenium").setLevel(logging.CRITICAL)
-    # Start the webdriver without any logs
-    driver = webdriver.Chrome(options=Options())
-    driver.maximize_window()
-    driver.get("https://www.linkedin.com/login/")
-
-    print("Inputting the credentials...")
-    lk_credentials = get_lk_credentials(LK_CREDENTIALS_PATH)
-    enter_ids_on_lk_signin(driver, lk_credentials["email"], lk_credentials["password"])
-
-    if "checkpoint/challenge" in driver.current_url:
-        print(
-            "It looks like you need to complete a double factor authentification. Please do so and press enter when you are done."
-        )
-        input()
-
-    print("Selecting the contract...")
-
-    select_contract_lk(driver)
-
-    driver.get(search_url)
-
-    print(
-        "Manual actions needed: go to the browser window and unzoom the page so that the whole page fits in the screen in 2 times. Then press enter here."
-    )
-    input()
-
-    print("Starting the scraping...")
-
-    lkr_search_infos = scrap_lkr_pages(
+    page_source = load_search_page(
+        PAGE_SCRAPER,
         driver,
-        range(start, end + 1),
-        get_search_url=lambda x: get_search_url(search_url_base, start=x),
-        backups="./lkr_data/",
-        wait_time_between_pages=wait_time_between_pages,
+        url,
         wait_after_page_loaded=wait_after_page_loaded,
         wait_after_scroll_down=wait_after_scroll_down,
+        snapshot_archive=snapshot_archive,
+        network_stats=network_stats,
+        metrics=metrics,
+    )
+    return parse_search_page(page_source, parser_backend, metrics=metrics)
+
+
+def get_info_frame(infos):
+    if not isinstance(infos, ResultTable):
+        table = ResultTable(LkrRecord)
+        table.extend(infos)
+        infos = table
+    df = infos.to_dataframe()
+    if len(df) > 0:
+        df.insert(
+            df.columns.get_loc("recruiter_link") + 1,
+            "linkedin_link",
+            df.recruiter_link.str.replace("talent/profile", "in", regex=False),
+        )
+        df = normalize_lk_profiles(df, "recruiter_link", RECRUITER_PROFILE_ID_PATTERN)
+    return df
+
+
+PAGE_SCRAPER = {
+    "record": LkrRecord,
+    "results_per_page": NUMBER_OF_LEADS_PER_PAGE,
+    "rendered_result_selector": RESULT_SELECTOR,
+    "scroll_command": SCROLL_TO_BOTTOM_COMMAND,
+    "total_results_selector": TOTAL_RESULTS_SELECTOR,
+    "parse_page_source": parse_search_page,
+    "extract_in_browser": parse_search_page_in_browser,
+    "get_info_frame": get_info_frame,
+}
+
+
+def scrap_lkr_pages(driver, page_list, get_search_url, **options):
+    # The options are the ones of lk_search.scrap_search_pages
+    return scrap_search_pages(
+        PAGE_SCRAPER, driver, page_list, get_search_url, **options
     )
 
-    df = pd.DataFrame(lkr_search_infos)
 
-    if save_format == "csv":
-        file_name = f"{str(int(time.time()*1000))}_lk_r_export.csv"
-        df.to_csv(f"./lkr_data/{file_name}", index=False)
-        print(f"Saved the data in ./lkr_data/{file_name}")
-    else:
-        # save_format=="xlsx"
-        file_name = f"{str(int(time.time()*1000))}_lk_r_export.xlsx"
-        df.to_excel(f"./lkr_data/{file_name}", index=False)
-        print(f"Saved the data in ./lkr_data/{file_name}")
+if __name__ == "__main__":
+    # The options and the run are shared by all the tools (see lk_cli.py)
+    from lk_cli import main
 
-    print("Done.")
-    driver.close()
+    main(["recruiter", *sys.argv[1:]])
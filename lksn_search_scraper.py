@@ -5,31 +5,194 @@ It will scrap the search results of a LinkedIn Sales Navigator search.
 Example usage:
 python lksn_search_scraper.py --search-url "https://www.linkedin.com/sales/search/people?query=(spellCorrectionEnabled%3Atrue%2Ckeywords%3Ascraping)"
 """
-import argparse
-import os
-import logging
-from bs4 import BeautifulSoup
 from tqdm import tqdm
+import sys
 import time
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-import pandas as pd
-from general_lk_utils import (
-    remove_url_parameter,
-    get_lk_credentials,
-    enter_ids_on_lk_signin,
-    get_lk_url_from_sales_lk_url,
+from general_lk_utils import normalize_lk_profiles, SALES_LEAD_ID_PATTERN
+from lk_html_backends import (
+    DEFAULT_PARSER_BACKEND,
+    parse_html,
+    free_html,
 )
+from lk_browser_extraction import (
+    plan_to_json,
+    extract_results_in_browser,
+    check_extraction_spec,
+)
+from lk_metrics import NULL_METRICS
+from lk_records import Record, ResultTable
+from lk_search import load_search_page, scrap_search_pages
 
 SCROLL_TO_BOTTOM_COMMAND = (
     "document.getElementById('search-results-container').scrollTop+=100000;"
 )
-LK_CREDENTIALS_PATH = "./lk_credentials.json"
+JOURNAL_DIR = "./lksn_data/journal/"
+NUMBER_OF_LEADS_PER_PAGE = 25
+# The only part of the page that is parsed
+RESULTS_CONTAINER_ID = "search-results-container"
+# Only the cards that have been rendered (the list items are created before)
+RESULT_CARD_SELECTOR = "#search-results-container > div > ol > li"
+RENDERED_RESULT_SELECTOR = (
+    "#search-results-container > div > ol > li div.artdeco-entity-lockup__title"
+)
+# The total number of results of the search, above the results. Unverified: it was
+# written for the pages of lk_fixtures.py and hasn't been checked on the real pages. When
+# it matches nothing, the end of the search is only detected by a short page.
+TOTAL_RESULTS_SELECTOR = "span.search-results__total"
+
+
+# All the fields of a result card live under the same body element, so the card is
+# only searched once for it and the fields are then collected in a single walk of
+# its children, following the paths below (tag name, classes).
+RESULT_BODY_SELECTOR = (
+    "div > div > div.flex.justify-space-between.full-width > div.flex.flex-column"
+)
+IN_BODY_LOCKUP_PATH = [
+    ("div", "mb3"),
+    ("div", ""),
+    ("div", "artdeco-entity-lockup__content ember-view"),
+]
+IN_LOCKUP_TITLE_PATH = [
+    ("div", "flex flex-wrap align-items-center"),
+    ("div", "artdeco-entity-lockup__title ember-view"),
+    ("a", ""),
+]
+IN_LOCKUP_DEGREE_PATH = [
+    ("div", "flex flex-wrap align-items-center"),
+    ("div", "artdeco-entity-lockup__badge ember-view ml1"),
+    ("span", "artdeco-entity-lockup__degree"),
+]
+IN_LOCKUP_PREMIUM_PATH = [("div", "inline-flex"), ("div", ""), ("li-icon", "")]
+IN_LOCKUP_ROLE_PATH = [
+    ("div", "artdeco-entity-lockup__subtitle ember-view t-14"),
+    ("span", ""),
+]
+IN_LOCKUP_COMPANY_PATH = [
+    ("div", "artdeco-entity-lockup__subtitle ember-view t-14"),
+    ("a", ""),
+]
+IN_LOCKUP_METADATA_PATH = [("div", "artdeco-entity-lockup__metadata ember-view")]
+IN_BODY_ADDITIONAL_INFO_PATH = [
+    ("div", "ml8 pl1"),
+    ("dl", ""),
+    ("div", ""),
+    ("dd", ""),
+    ("div", ""),
+    ("span", ""),
+]
+
+RESULT_FIELD_PATHS = {
+    "name": IN_BODY_LOCKUP_PATH + IN_LOCKUP_TITLE_PATH,
+    "connection_level": IN_BODY_LOCKUP_PATH + IN_LOCKUP_DEGREE_PATH,
+    "has_linkedin_premium": IN_BODY_LOCKUP_PATH + IN_LOCKUP_PREMIUM_PATH,
+    "role_name": IN_BODY_LOCKUP_PATH + IN_LOCKUP_ROLE_PATH,
+    "company": IN_BODY_LOCKUP_PATH + IN_LOCKUP_COMPANY_PATH,
+    "time_in_company": IN_BODY_LOCKUP_PATH + IN_LOCKUP_METADATA_PATH,
+    "additional_info": IN_BODY_ADDITIONAL_INFO_PATH,
+}
+
+
+# Types of the exported columns, used for typed formats (parquet)
+RESULT_COLUMN_TYPES = {
+    "name": "string",
+    "link_to_profile": "string",
+    "connection_level": "category",
+    "has_linkedin_premium": "bool",
+    "role_name": "string",
+    "link_to_company": "string",
+    "company_name": "string",
+    "time_in_company": "string",
+    "additional_info": "string",
+    "time_scraped": "int64",
+    "linkedin_url": "string",
+    "lead_id": "string",
+    "months_in_role": "int64",
+    "months_in_company": "int64",
+}
+
+
+class LksnRecord(Record):
+    # The columns of RESULT_COLUMN_TYPES, the ones after time_scraped being derived when
+    # exporting (see normalize_lk_profiles)
+    __slots__ = FIELDS = (
+        "name",
+        "link_to_profile",
+        "connection_level",
+        "has_linkedin_premium",
+        "role_name",
+        "link_to_company",
+        "company_name",
+        "time_in_company",
+        "additional_info",
+        "time_scraped",
+    )
 
 
-def get_name_info_from_result_el(result_el):
-    selector = "div > div > div.flex.justify-space-between.full-width > div.flex.flex-column > div.mb3 > div > div.artdeco-entity-lockup__content.ember-view > div.flex.flex-wrap.align-items-center > div.artdeco-entity-lockup__title.ember-view > a"
-    els = result_el.select(selector)
+def compile_extraction_plan(field_paths):
+    # Merge the paths into a tree so that shared prefixes (the lockup container) are
+    # only walked once
+    plan = {"fields": [], "children": {}}
+    for field, path in field_paths.items():
+        node = plan
+        for name, classes in path:
+            key = (name, frozenset(classes.split()))
+            node = node["children"].setdefault(key, {"fields": [], "children": {}})
+        node["fields"].append(field)
+    return plan
+
+
+RESULT_EXTRACTION_PLAN = compile_extraction_plan(RESULT_FIELD_PATHS)
+
+# The fields of LksnRecord, read in the browser from the elements found by the plan like
+# the get_*_info_from_els helpers do, and time_scraped when each card is read (see
+# lk_browser_extraction.py)
+RESULT_BROWSER_COLUMNS = [
+    {"found": "name", "index": 0, "value": "first_text", "default": ""},
+    {"found": "name", "index": 0, "value": "@href", "default": ""},
+    {
+        "found": "connection_level",
+        "index": 0,
+        "value": "first_text",
+        "default": "",
+        "remove": "·\xa0",
+    },
+    {"found": "has_linkedin_premium", "index": 0, "value": "exists"},
+    {"found": "role_name", "index": 0, "value": "first_text", "default": ""},
+    {"found": "company", "index": 0, "value": "@href", "default": ""},
+    {"found": "company", "index": 0, "value": "first_text", "default": ""},
+    {"found": "time_in_company", "index": 0, "value": "text_nodes", "default": ""},
+    {"found": "additional_info", "index": 1, "value": "text_nodes", "default": ""},
+    {"value": "time"},
+]
+RESULT_BROWSER_EXTRACTION_SPEC = {
+    "cards_selector": RESULT_CARD_SELECTOR,
+    "body_selector": RESULT_BODY_SELECTOR,
+    "plan": plan_to_json(RESULT_EXTRACTION_PLAN),
+    "columns": RESULT_BROWSER_COLUMNS,
+}
+check_extraction_spec(RESULT_BROWSER_EXTRACTION_SPEC)
+
+
+def run_extraction_plan(el, plan, found):
+    for child in el.contents:
+        # Text nodes (strings, comments) can't be part of a path
+        if isinstance(child, str):
+            continue
+        child_classes = child.get("class") or []
+        for (name, classes), node in plan["children"].items():
+            if child.name == name and classes.issubset(child_classes):
+                for field in node["fields"]:
+                    found.setdefault(field, []).append(child)
+                if node["children"]:
+                    run_extraction_plan(child, node, found)
+    return found
+
+
+def get_text_nodes(el):
+    return [content for content in el.contents if isinstance(content, str)]
+
+
+def get_name_info_from_els(els):
     link_to_profile = ""
     name = ""
     if len(els) > 0:
@@ -37,19 +200,16 @@ def get_name_info_from_result_el(result_el):
         el_contents = els[0].contents
         if len(el_contents) > 0:
             name = el_contents[0].strip()
-    return {"name": name, "link_to_profile": link_to_profile}
+    return name, link_to_profile
 
 
-def get_connection_level_info_from_result_el(result_el):
-    selector = "div > div > div.flex.justify-space-between.full-width > div.flex.flex-column > div.mb3 > div > div.artdeco-entity-lockup__content.ember-view > div.flex.flex-wrap.align-items-center > div.artdeco-entity-lockup__badge.ember-view.ml1 > span.artdeco-entity-lockup__degree"
-    els = result_el.select(selector)
+def get_connection_level_info_from_els(els):
     connection_level = ""
     if len(els) > 0:
-        link_to_profile = els[0]
         el_contents = els[0].contents
         if len(el_contents) > 0:
             connection_level = el_contents[0].strip().replace("·\xa0", "")
-    return {"connection_level": connection_level}
+    return connection_level
 
 
 def get_search_url(search_url_base, page=1):
@@ -57,30 +217,24 @@ def get_search_url(search_url_base, page=1):
     return url
 
 
-def get_linkedin_premium_info_from_result_el(result_el):
-    selector = "div > div > div.flex.justify-space-between.full-width > div.flex.flex-column > div.mb3 > div > div.artdeco-entity-lockup__content.ember-view > div.inline-flex > div > li-icon"
-    els = result_el.select(selector)
+def get_linkedin_premium_info_from_els(els):
     has_linkedin_premium = False
     if len(els) > 0:
         has_linkedin_premium = True
-    return {"has_linkedin_premium": has_linkedin_premium}
+    return has_linkedin_premium
 
 
-def get_role_info_from_result_el(result_el):
-    selector = "div > div > div.flex.justify-space-between.full-width > div.flex.flex-column > div.mb3 > div > div.artdeco-entity-lockup__content.ember-view > div.artdeco-entity-lockup__subtitle.ember-view.t-14 > span"
-    els = result_el.select(selector)
+def get_role_info_from_els(els):
     role_name = ""
     if len(els) > 0:
         el_contents = els[0].contents
 
         if len(el_contents) > 0:
             role_name = el_contents[0].strip()
-    return {"role_name": role_name}
+    return role_name
 
 
-def get_company_info_from_result_el(result_el):
-    selector = "div > div > div.flex.justify-space-between.full-width > div.flex.flex-column > div.mb3 > div > div.artdeco-entity-lockup__content.ember-view > div.artdeco-entity-lockup__subtitle.ember-view.t-14 > a"
-    els = result_el.select(selector)
+def get_company_info_from_els(els):
     link_to_company = ""
     company_name = ""
     if len(els) > 0:
@@ -88,243 +242,158 @@ def get_company_info_from_result_el(result_el):
         el_contents = els[0].contents
         if len(el_contents) > 0:
             company_name = el_contents[0].strip()
-    return {"link_to_company": link_to_company, "company_name": company_name}
+    return link_to_company, company_name
 
 
-def get_time_in_company_info_from_result_el(result_el):
-    selector = "div > div > div.flex.justify-space-between.full-width > div.flex.flex-column > div.mb3 > div > div.artdeco-entity-lockup__content.ember-view > div.artdeco-entity-lockup__metadata.ember-view"
-    els = result_el.select(selector)
+def get_time_in_company_info_from_els(els):
     time_in_company = ""
     if len(els) > 0:
-        el_contents = els[0].contents
-        if len(el_contents) > 0:
+        if len(els[0].contents) > 0:
             time_in_company = " | ".join(
                 [
-                    el_contents[i].strip().replace("\xa0", " ")
-                    for i in range(len(el_contents))
-                    if "<span" not in str(el_contents[i])
+                    text_node.strip().replace("\xa0", " ")
+                    for text_node in get_text_nodes(els[0])
                 ]
             )
-    return {"time_in_company": time_in_company}
+    return time_in_company
 
 
-def get_additional_info_from_result_el(result_el):
-    selector = "div > div > div.flex.justify-space-between.full-width > div.flex.flex-column > div.ml8.pl1 > dl > div > dd > div > span"
-    els = result_el.select(selector)
+def get_additional_info_from_els(els):
     additional_info = ""
     if len(els) > 1:
-        el_contents = els[1].contents
-        if len(el_contents) > 0:
+        if len(els[1].contents) > 0:
             additional_info = " | ".join(
                 [
-                    el_contents[i].strip().replace("\xa0", " ")
-                    for i in range(len(el_contents))
-                    if "<span" not in str(el_contents[i])
-                    and "<button" not in str(el_contents[i])
+                    text_node.strip().replace("\xa0", " ")
+                    for text_node in get_text_nodes(els[1])
                 ]
             )
-    return {"additional_info": additional_info}
-
-
-def get_info_from_result_el(result_el):
-    r = []
-    r.append(get_name_info_from_result_el(result_el))
-    r.append(get_connection_level_info_from_result_el(result_el))
-    r.append(get_linkedin_premium_info_from_result_el(result_el))
-    r.append(get_role_info_from_result_el(result_el))
-    r.append(get_company_info_from_result_el(result_el))
-    r.append(get_time_in_company_info_from_result_el(result_el))
-    r.append(get_additional_info_from_result_el(result_el))
-
-    info = {}
-
-    for obj in r:
-        for k in obj.keys():
-            info[k] = obj[k]
-
-    info["time_scraped"] = int(time.time() * 1000)
-    return info
+    return additional_info
+
+
+def get_info_from_result_el(result_el, time_scraped=None):
+    found = {}
+    for body_el in result_el.select(RESULT_BODY_SELECTOR):
+        run_extraction_plan(body_el, RESULT_EXTRACTION_PLAN, found)
+
+    name, link_to_profile = get_name_info_from_els(found.get("name", []))
+    link_to_company, company_name = get_company_info_from_els(found.get("company", []))
+    if time_scraped is None:
+        time_scraped = int(time.time() * 1000)
+    return LksnRecord(
+        name,
+        link_to_profile,
+        get_connection_level_info_from_els(found.get("connection_level", [])),
+        get_linkedin_premium_info_from_els(found.get("has_linkedin_premium", [])),
+        get_role_info_from_els(found.get("role_name", [])),
+        link_to_company,
+        company_name,
+        get_time_in_company_info_from_els(found.get("time_in_company", [])),
+        get_additional_info_from_els(found.get("additional_info", [])),
+        time_scraped,
+    )
 
 
-def get_result_els(page_source):
-    soup = BeautifulSoup(page_source, "html.parser")
-    full_results_selector = "#search-results-container > div > ol > li"
-    all_results_el = soup.select(full_results_selector)
+def get_result_els(page_source, parser_backend=DEFAULT_PARSER_BACKEND):
+    soup = parse_html(page_source, parser_backend, container_id=RESULTS_CONTAINER_ID)
+    all_results_el = soup.select(RESULT_CARD_SELECTOR)
     return all_results_el
 
 
-def get_all_info_from_page_source(page_source):
+def get_all_info_from_page_source(
+    page_source,
+    parser_backend=DEFAULT_PARSER_BACKEND,
+    time_scraped=None,
+    metrics=NULL_METRICS,
+):
     print("Getting all result elements...")
-    result_els = get_result_els(page_source)
+    with metrics.span("parse"):
+        result_els = get_result_els(page_source, parser_backend)
     n = len(result_els)
     print(f"Found {n} elements.")
 
     print("Getting the info for all elements...")
     infos = []
-    for i in tqdm(range(n)):
-        new_info = get_info_from_result_el(result_els[i])
-        infos.append(new_info)
+    with metrics.span("extract", results=n):
+        for i in tqdm(range(n)):
+            new_info = get_info_from_result_el(result_els[i], time_scraped)
+            infos.append(new_info)
+    if result_els:
+        free_html(result_els[0])
     return infos
 
 
-def get_all_info_from_search_url(
-    driver, url, wait_after_page_loaded=3, wait_after_scroll_down=2
-):
-    driver.get(url)
-    print(f"Waiting for {wait_after_page_loaded}s...")
-    time.sleep(wait_after_page_loaded)
-
-    # Chrome must be unzoomed so that the whole page fits in the screen in 2 times
-    try:
-        driver.execute_script(SCROLL_TO_BOTTOM_COMMAND)
-    except:
-        print("There was an error scrolling down")
-    print(f"Waiting for {wait_after_scroll_down}s...")
-    time.sleep(wait_after_scroll_down)
-    page_source = driver.page_source
-    page_parsed_info = get_all_info_from_page_source(page_source)
-    return page_parsed_info
+def get_all_info_from_browser(driver, time_scraped=None, metrics=NULL_METRICS):
+    # The same rows as get_all_info_from_page_source, extracted from the current page in
+    # the browser
+    print("Getting the info for all elements in the browser...")
+    with metrics.span("extract"):
+        rows = extract_results_in_browser(driver, RESULT_BROWSER_EXTRACTION_SPEC)
+    print(f"Found {len(rows)} elements.")
+    # Each card is dated when it was read, unless the time is given
+    if time_scraped is not None:
+        return [LksnRecord(*values[:-1], time_scraped) for values in rows]
+    return [LksnRecord(*values) for values in rows]
 
 
-def scrap_lksn_pages(
+def get_all_info_from_search_url(
     driver,
-    page_list,
-    get_search_url,
-    wait_time_between_pages=3,
+    url,
     wait_after_page_loaded=3,
     wait_after_scroll_down=2,
+    parser_backend=DEFAULT_PARSER_BACKEND,
+    snapshot_archive=None,
+    network_stats=False,
+    metrics=NULL_METRICS,
 ):
-    total_info = []
-    for p in page_list:
-        print(f"Waiting for {wait_time_between_pages}s...")
-        time.sleep(wait_time_between_pages)
-
-        print(f"Getting new page: {p}.")
-        info = get_all_info_from_search_url(
-            driver,
-            get_search_url(p),
-            wait_after_page_loaded=wait_after_page_loaded,
-            wait_after_scroll_down=wait_after_scroll_down,
-        )
-        total_info += info
-    return total_info
-
-
-if __name__ == "__main__":
-    # Parse the arguments
-    parser = argparse.ArgumentParser(description="Scrap LinkedIn Sales Navigator")
-    parser.add_argument(
-        "--search-url",
-        type=str,
-        help="The url of the search page to scrap",
-        required=True,
-    )
-    parser.add_argument(
-        "--start-page",
-        type=int,
-        help="The page to start scrapping from",
-        required=False,
-        default=1,
-    )
-    parser.add_argument(
-        "--end-page",
-        type=int,
-        help="The page to end scrapping at",
-        required=False,
-        default=1,
-    )
-    parser.add_argument(
-        "--wait-time-between-pages",
-        type=int,
-        help="The time in seconds to wait between pages",
-        required=False,
-        default=5,
-    )
-    parser.add_argument(
-        "--wait-after-page-loaded",
-        type=int,
-        help="The time in seconds to wait after the page is loaded",
-        required=False,
-        default=3,
-    )
-    parser.add_argument(
-        "--wait-after-scroll-down",
-        type=int,
-        help="The time in seconds to wait after scrolling down",
-        required=False,
-        default=3,
-    )
-    parser.add_argument(
-        "--save-format",
-        type=str,
-        help="The format to save the data in (xlsx or csv)",
-        required=False,
-        default="csv",
+    page_source = load_search_page(
+        PAGE_SCRAPER,
+        driver,
+        url,
+        wait_after_page_loaded=wait_after_page_loaded,
+        wait_after_scroll_down=wait_after_scroll_down,
+        snapshot_archive=snapshot_archive,
+        network_stats=network_stats,
+        metrics=metrics,
     )
-    args = parser.parse_args()
-
-    # Get the arguments
-    search_url = args.search_url
-    start_page = args.start_page
-    end_page = args.end_page
-    wait_time_between_pages = args.wait_time_between_pages
-    wait_after_page_loaded = args.wait_after_page_loaded
-    wait_after_scroll_down = args.wait_after_scroll_down
-    save_format = args.save_format
-    search_url_base = remove_url_parameter(search_url, "page")
-
-    print("Starting the driver...")
-    logging.getLogger("selenium").setLevel(logging.CRITICAL)
-    # Start the webdriver without any logs
-    driver = webdriver.Chrome(options=Options())
-    driver.maximize_window()
-    driver.get("https://www.linkedin.com/login/")
-
-    print("Inputting the credentials...")
-    lk_credentials = get_lk_credentials(LK_CREDENTIALS_PATH)
-    enter_ids_on_lk_signin(driver, lk_credentials["email"], lk_credentials["password"])
-
-    if "checkpoint/challenge" in driver.current_url:
-        print(
-            "It looks like you need to complete a double factor authentification. Please do so and press enter when you are done."
-        )
-        input()
-
-    driver.get(search_url)
-
-    print(
-        "Manual actions needed: go to the browser window and unzoom the page so that the whole page fits in the screen in 2 times. Then press enter here."
+    page_parsed_info = get_all_info_from_page_source(
+        page_source, parser_backend, metrics=metrics
     )
-    input()
+    return page_parsed_info
 
-    print("Starting the scraping...")
 
-    lksnSearchInfos = scrap_lksn_pages(
-        driver,
-        page_list=range(start_page, end_page + 1),
-        get_search_url=lambda x: get_search_url(search_url_base, x),
-        wait_time_between_pages=wait_time_between_pages,
-        wait_after_page_loaded=wait_after_page_loaded,
-        wait_after_scroll_down=wait_after_scroll_down,
+def get_info_frame(infos):
+    if not isinstance(infos, ResultTable):
+        table = ResultTable(LksnRecord)
+        table.extend(infos)
+        infos = table
+    df = infos.to_dataframe()
+    if len(df) > 0:
+        df = normalize_lk_profiles(df, "link_to_profile", SALES_LEAD_ID_PATTERN)
+    return df
+
+
+PAGE_SCRAPER = {
+    "record": LksnRecord,
+    "results_per_page": NUMBER_OF_LEADS_PER_PAGE,
+    "rendered_result_selector": RENDERED_RESULT_SELECTOR,
+    "scroll_command": SCROLL_TO_BOTTOM_COMMAND,
+    "total_results_selector": TOTAL_RESULTS_SELECTOR,
+    "parse_page_source": get_all_info_from_page_source,
+    "extract_in_browser": get_all_info_from_browser,
+    "get_info_frame": get_info_frame,
+}
+
+
+def scrap_lksn_pages(driver, page_list, get_search_url, **options):
+    # The options are the ones of lk_search.scrap_search_pages
+    return scrap_search_pages(
+        PAGE_SCRAPER, driver, page_list, get_search_url, **options
     )
 
-    df = pd.DataFrame(lksnSearchInfos)
-    df["linkedin_url"] = df.link_to_profile.apply(get_lk_url_from_sales_lk_url)
-
-    if save_format == "csv":
-        file_name = f"{str(int(time.time()*1000))}_lk_salesnav_export.csv"
-        df.to_csv(
-            f"./lksn_data/{file_name}",
-            index=False,
-        )
-        print(f"Saved to ./lksn_data/{file_name}")
-    else:
-        #  save_format=="xlsx"
-        file_name = f"{str(int(time.time()*1000))}_lk_salesnav_export.xlsx"
-        df.to_excel(
-            f"./lksn_data/{file_name}",
-            index=False,
-        )
-        print(f"Saved to ./lksn_data/{file_name}")
-
-    driver.close()
+
+if __name__ == "__main__":
+    # The options and the run are shared by all the tools (see lk_cli.py)
+    from lk_cli import main
+
+    main(["salesnav", *sys.argv[1:]])